@@ -2,12 +2,20 @@ import streamlit as st
 import json
 from pathlib import Path
 from policy_analyzer import PolicyAnalyzer
-from scraper import PolicyScraper
-from database import db
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import threading
+from scraper import PolicyScraper, extract_company, normalize_website
+from database import get_db
+from response_cache import discard_pending, get_cached_response, store_response
+from cache_metrics import instrument, cache_stats
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import atexit
+import os
+import requests
+import subprocess
+import sys
 import time
+import uuid
 
 # Page config
 st.set_page_config(
@@ -18,7 +26,9 @@ st.set_page_config(
 )
 
 # Clean white background with black text
-st.markdown("""
+@instrument('_css_block', st.cache_data)
+def _css_block() -> str:
+    return """
 <style>
     /* Hide Streamlit elements */
     #MainMenu {visibility: hidden;}
@@ -75,29 +85,6 @@ st.markdown("""
         box-shadow: 0 4px 12px rgba(220, 53, 69, 0.15);
     }
     
-    /* Warning box */
-    .warning-box {
-        background: white;
-        border: 2px solid #ffc107;
-        border-radius: 8px;
-        padding: 1.5rem;
-        margin: 1.5rem 0;
-    }
-    
-    /* Danger box */
-    .danger-box {
-        background: white;
-        border: 2px solid #dc3545;
-        border-radius: 8px;
-        padding: 1.5rem;
-        margin: 1.5rem 0;
-    }
-    
-    /* Score styling */
-    .score-bad { color: #dc3545; font-weight: bold; font-size: 2em; }
-    .score-ok { color: #ffc107; font-weight: bold; font-size: 2em; }
-    .score-good { color: #28a745; font-weight: bold; font-size: 2em; }
-    
     /* Black text for everything */
     h1, h2, h3, h4, h5, h6 {
         color: black !important;
@@ -110,12 +97,6 @@ st.markdown("""
         font-size: 1rem !important;
     }
     
-    .big-text {
-        color: black !important;
-        font-size: 1.1rem !important;
-        font-weight: 500 !important;
-    }
-    
     /* Ensure all content areas have white background */
     .element-container {
         background-color: white !important;
@@ -127,119 +108,119 @@ st.markdown("""
         color: black !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(_css_block(), unsafe_allow_html=True)
 
 # Initialize
-@st.cache_resource
+@instrument('get_analyzer', st.cache_resource)
 def get_analyzer():
     return PolicyAnalyzer()
 
+@instrument('get_scraper', st.cache_resource)
+def get_scraper():
+    return PolicyScraper()
+
 analyzer = get_analyzer()
+db = get_db()
 
-# Flask API for browser extension
-flask_app = Flask(__name__)
-CORS(flask_app)
+# Static HTML fragments (header, call to action, footer) live in templates/
+@st.cache_data
+def _tpl(name: str) -> str:
+    return (Path(__file__).parent / 'templates' / f'{name}.html').read_text(encoding='utf-8')
 
-@flask_app.route('/api/analyze', methods=['POST'])
-def api_analyze():
-    try:
-        data = request.json
-        analysis_type = data.get('analysis_type', 'policy')
-        
-        if analysis_type == 'company':
-            # Company website analysis
-            company_website = data.get('company_website') or data.get('url', '')
-            
-            if not company_website:
-                return jsonify({'error': 'No company website provided'}), 400
-            
-            # Clean up URL
-            if company_website.startswith('https://'):
-                company_website = company_website.replace('https://', '')
-            if company_website.startswith('http://'):
-                company_website = company_website.replace('http://', '')
-            
-            # Use scraper to analyze company website
-            scraper = PolicyScraper()
-            scrape_result = scraper.scrape_company_website(company_website)
-            
-            if scrape_result['scraped']:
-                # Successfully scraped - analyze with AI
-                analysis = analyzer.analyze_scraped_policy(
-                    scrape_result['text'], 
-                    scrape_result['company_name']
-                )
-                analysis['source'] = 'live_scraping'
-                analysis['privacy_url'] = scrape_result['privacy_url']
-                analysis['website'] = company_website
-            else:
-                # Scraping failed - use generic analysis
-                analysis = analyzer.get_generic_analysis(scrape_result['company_name'])
-                analysis['source'] = 'generic'
-                analysis['website'] = company_website
-            
-            # Save to database
-            try:
-                db.save_analysis(analysis, 'browser_extension')
-                db.update_user_session('browser_extension', scrape_result['company_name'])
-            except Exception as e:
-                print(f"Database save error: {e}")
-            
-            return jsonify(analysis)
-        
-        else:
-            # Regular policy text analysis
-            platform = data.get('platform', 'Unknown Platform')
-            policy_text = data.get('text', '')
-            
-            if policy_text:
-                # Analyze provided text
-                analysis = analyzer.analyze_text_for_harmful_points(policy_text, platform)
-            else:
-                # Use predefined platform analysis
-                analysis = analyzer.get_harmful_points(platform)
-            
-            return jsonify(analysis)
-        
-    except Exception as e:
-        print(f"API Error: {e}")
-        return jsonify({'error': str(e)}), 500
+# pandas is only needed by the admin tables; import it once, on first use
+@st.cache_resource
+def _pd():
+    import pandas as pd
+    return pd
 
-@flask_app.route('/api/health', methods=['GET'])
-def api_health():
-    return jsonify({'status': 'ok', 'message': 'Privacy Policy Analyzer API is running'})
+# Scraping and LLM calls run here so the script thread can keep repainting
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=8)
 
-@flask_app.route('/api/chat', methods=['POST'])
-def api_chat():
-    try:
-        data = request.json
-        question = data.get('question', '')
-        platform = data.get('platform', 'Unknown Platform')
-        
-        if not question.strip():
-            return jsonify({'error': 'Question is required'}), 400
+def run_analysis(analyzer: PolicyAnalyzer, scraper: PolicyScraper,
+                 platform: str, website: str, session_id: str) -> dict:
+    """Scrape and analyze a policy in a worker thread (no st.* calls in here, so the
+    cached analyzer and scraper are resolved by the script thread and passed in)"""
+    if website is None:
+        # Predefined platform analysis (not response-cached, so policy file edits show up;
+        # the Bedrock call is cached per prompt)
+        analysis = analyzer.get_harmful_points(platform)
+        analysis['source'] = 'predefined'
+        return {'analysis': analysis}
+    
+    # Custom website analysis with real scraping (keyed like the API, so both share entries)
+    website = normalize_website(website)
+    cache_inputs = {'url': website, 'analysis_type': 'company'}
+    analysis = get_cached_response(cache_inputs)
+    
+    if analysis is None:
+        scrape_result = scraper.scrape_company_website(website)
         
-        # Use the analyzer's chat functionality
-        response = analyzer.chat_with_ai(question, platform)
+        if not scrape_result['scraped']:
+            discard_pending(cache_inputs)
+            return {'analysis': None, 'scrape_result': scrape_result}
         
-        return jsonify({
-            'response': response,
-            'platform': platform,
-            'question': question
-        })
+        # Successfully scraped - analyze with AI
+        analysis = analyzer.analyze_scraped_policy(
+            scrape_result['text'], 
+            scrape_result['company_name']
+        )
+        analysis['source'] = 'live_scraping'
+        analysis['privacy_url'] = scrape_result['privacy_url']
+        analysis['company_website'] = scrape_result['company_website']
+        analysis['website'] = website
+        store_response(cache_inputs, analysis)
+    
+    # Save to database
+    try:
+        db.save_with_session(analysis, session_id, analysis['company_name'])
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        print(f"Database save error: {e}")
+    
+    return {'analysis': analysis}
 
-# Start Flask API in background thread
+# Browser extension API (see wsgi.py), served by gunicorn alongside Streamlit
+def wait_for_api(process: subprocess.Popen, timeout: float = 15.0) -> bool:
+    """Poll /api/health until the API answers, instead of sleeping a fixed time"""
+    port = os.getenv('API_BIND', '0.0.0.0:8502').rsplit(':', 1)[-1]
+    deadline = time.monotonic() + timeout
+    
+    while time.monotonic() < deadline:
+        # Exited (e.g. the port is still held by another server): whatever answers isn't ours
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/api/health', timeout=0.5).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    
+    return False
+
+@st.cache_resource
 def start_flask_api():
-    flask_app.run(host='0.0.0.0', port=8502, debug=False)
+    # Run from the app directory so gunicorn finds its config and wsgi wherever Streamlit was started
+    app_dir = Path(__file__).parent
+    process = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn',
+        '-c', str(app_dir / 'gunicorn.conf.py'),
+        'wsgi:flask_app'
+    ], cwd=app_dir)
+    # Don't leave gunicorn holding the port after Streamlit exits
+    atexit.register(process.terminate)
+    
+    if wait_for_api(process):
+        print("✅ Extension API is ready")
+    else:
+        print("⚠️ Extension API did not become healthy in time")
+    return process
 
-# Start API server
-if 'flask_started' not in st.session_state:
-    st.session_state.flask_started = True
-    api_thread = threading.Thread(target=start_flask_api, daemon=True)
-    api_thread.start()
-    time.sleep(1)  # Give Flask time to start
+# Start API server (once per process; later sessions get the cached handle)
+start_flask_api()
 
 # Platform data - simplified
 PLATFORMS = {
@@ -251,24 +232,22 @@ PLATFORMS = {
     "Finn.no": {"icon": "🏠", "category": "Marketplace"},
 }
 
+# Selection buttons as (platform, label), built once instead of on every rerun
+_PLATFORM_BUTTONS = tuple((platform, f"{info['icon']} {platform}") for platform, info in PLATFORMS.items())
+
+# Oldest chat exchanges are dropped past this many per session
+CHAT_HISTORY_LIMIT = 50
+
 # Session state
 if 'selected_platform' not in st.session_state:
     st.session_state.selected_platform = None
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
 if 'session_id' not in st.session_state:
-    import uuid
     st.session_state.session_id = str(uuid.uuid4())
 
 # Header
-st.markdown("""
-<div style="text-align: center; padding: 2rem 0; background-color: white;">
-    <h1 style="font-size: 2.5rem; margin: 0; color: black;">🔒 Privacy Analyzer</h1>
-    <p style="font-size: 1.2rem; color: black; margin: 0.5rem 0 0 0;">
-        Find out what's actually dangerous in privacy policies
-    </p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_tpl('header'), unsafe_allow_html=True)
 
 # Main content
 if st.session_state.selected_platform is None:
@@ -298,9 +277,9 @@ if st.session_state.selected_platform is None:
     st.markdown("### Or choose a popular platform:")
     
     cols = st.columns(3)
-    for i, (platform, info) in enumerate(PLATFORMS.items()):
+    for i, (platform, label) in enumerate(_PLATFORM_BUTTONS):
         with cols[i % 3]:
-            if st.button(f"{info['icon']} {platform}", key=platform):
+            if st.button(label, key=platform):
                 st.session_state.selected_platform = platform
                 st.rerun()
 
@@ -312,6 +291,8 @@ else:
     if st.button("← Back to selection"):
         st.session_state.selected_platform = None
         st.session_state.analysis_results = None
+        st.session_state.analysis_future = None
+        st.session_state.scrape_failure = None
         if 'custom_website' in st.session_state:
             del st.session_state.custom_website
         st.rerun()
@@ -322,12 +303,7 @@ else:
         website = st.session_state.custom_website
         
         # Extract company name from website
-        try:
-            from urllib.parse import urlparse
-            domain = urlparse(f"https://{website}" if not website.startswith('http') else website).netloc
-            company_name = domain.replace('www.', '').split('.')[0].capitalize()
-        except:
-            company_name = website
+        company_name = extract_company(website) or website
         
         # Custom website header
         st.markdown(f"""
@@ -357,52 +333,47 @@ else:
     
     # Analyze button
     if st.button("🔍 Analyze Privacy Risks"):
-        if platform == "custom" and 'custom_website' in st.session_state:
-            # Custom website analysis with real scraping
-            website = st.session_state.custom_website
-            
-            with st.spinner(f"🌐 Finding privacy policy on {website}..."):
-                # Use scraper to find and analyze privacy policy
-                scraper = PolicyScraper()
-                scrape_result = scraper.scrape_company_website(website)
-                
-                if scrape_result['scraped']:
-                    # Successfully scraped - analyze with AI
-                    with st.spinner("🤖 AI is analyzing the privacy policy..."):
-                        analysis = analyzer.analyze_scraped_policy(
-                            scrape_result['text'], 
-                            scrape_result['company_name']
-                        )
-                        analysis['source'] = 'live_scraping'
-                        analysis['privacy_url'] = scrape_result['privacy_url']
-                        analysis['company_website'] = scrape_result['company_website']
-                        analysis['website'] = website
-                        
-                        # Save to database
-                        try:
-                            db.save_analysis(analysis, st.session_state.get('session_id', 'web_user'))
-                            db.update_user_session(st.session_state.get('session_id', 'web_user'), 
-                                                 scrape_result['company_name'])
-                        except Exception as e:
-                            print(f"Database save error: {e}")
-                        
-                        st.session_state.analysis_results = analysis
-                else:
-                    # Scraping failed - show error with fallback
-                    st.error(f"❌ Could not find or access privacy policy on {website}")
-                    st.info(f"Error: {scrape_result.get('error', 'Unknown error')}")
-                    
-                    # Offer fallback analysis
-                    if st.button("📋 Use Generic Analysis Instead"):
-                        analysis = analyzer.get_generic_analysis(scrape_result['company_name'])
-                        analysis['source'] = 'generic'
-                        st.session_state.analysis_results = analysis
-        else:
-            # Predefined platform analysis
-            with st.spinner("🤖 AI is reading the privacy policy..."):
-                analysis = analyzer.get_harmful_points(platform)
-                analysis['source'] = 'predefined'
-                st.session_state.analysis_results = analysis
+        website = st.session_state.custom_website if platform == "custom" and 'custom_website' in st.session_state else None
+        st.session_state.scrape_failure = None
+        st.session_state.analysis_future = get_executor().submit(
+            run_analysis, analyzer, get_scraper(), platform, website, st.session_state.session_id
+        )
+    
+    # Poll the background analysis, rerunning until it finishes
+    future = st.session_state.get('analysis_future')
+    if future is not None:
+        if not future.done():
+            if platform == "custom" and 'custom_website' in st.session_state:
+                message = f"🌐 Finding and analyzing privacy policy on {st.session_state.custom_website}..."
+            else:
+                message = "🤖 AI is reading the privacy policy..."
+            with st.spinner(message):
+                time.sleep(0.5)
+            st.rerun()
+        
+        st.session_state.analysis_future = None
+        try:
+            outcome = future.result()
+            if outcome['analysis'] is not None:
+                st.session_state.analysis_results = outcome['analysis']
+            else:
+                st.session_state.scrape_failure = outcome['scrape_result']
+        except Exception as e:
+            st.error(f"❌ Analysis failed: {e}")
+    
+    # Scraping failed - show error with fallback
+    scrape_failure = st.session_state.get('scrape_failure')
+    if scrape_failure:
+        st.error(f"❌ Could not find or access privacy policy on {st.session_state.get('custom_website', '')}")
+        st.info(f"Error: {scrape_failure.get('error', 'Unknown error')}")
+        
+        # Offer fallback analysis
+        if st.button("📋 Use Generic Analysis Instead"):
+            generic = analyzer.get_generic_analysis(scrape_failure['company_name'])
+            generic['source'] = 'generic'
+            st.session_state.analysis_results = generic
+            st.session_state.scrape_failure = None
+            st.rerun()
     
     # Show results
     if st.session_state.analysis_results:
@@ -420,62 +391,35 @@ else:
         # Privacy Score - Big and prominent
         score = results['score']
         if score >= 70:
-            score_class = "score-good"
             score_text = "Low Risk"
-            score_color = "#28a745"
+            delta_color = "normal"
         elif score >= 50:
-            score_class = "score-ok"
             score_text = "Medium Risk"
-            score_color = "#ffc107"
+            delta_color = "off"
         else:
-            score_class = "score-bad"
             score_text = "High Risk"
-            score_color = "#dc3545"
+            delta_color = "inverse"
         
-        st.markdown(f"""
-        <div style="text-align: center; padding: 2rem; background: white; border-radius: 12px; 
-                    border: 3px solid {score_color}; margin: 2rem 0;">
-            <h3 style="margin: 0; color: #212529;">Privacy Risk Score</h3>
-            <div class="{score_class}">{score}/100</div>
-            <p style="font-size: 1.2rem; color: {score_color}; font-weight: 600; margin: 0;">
-                {score_text}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        with st.container(border=True):
+            st.metric("Privacy Risk Score", f"{score}/100", delta=score_text, delta_color=delta_color)
         
         # Main harmful points - This is what users need to see
         if results.get('harmful_points'):
-            st.markdown(f"""
-            <div class="danger-box">
-                <h3 style="color: #721c24; margin-top: 0;">🚨 What You Should Worry About</h3>
-                <div class="big-text">
-                    {results['harmful_points']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            with st.container(border=True):
+                st.markdown("### 🚨 What You Should Worry About")
+                st.markdown(results['harmful_points'])
         
         # Quick summary of most concerning data
         if results.get('worst_data'):
-            st.markdown(f"""
-            <div class="warning-box">
-                <h4 style="color: #856404; margin-top: 0;">📊 Most Concerning Data They Collect</h4>
-                <div class="big-text">
-                    {results['worst_data']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            with st.container(border=True):
+                st.markdown("#### 📊 Most Concerning Data They Collect")
+                st.markdown(results['worst_data'])
         
         # Simple recommendation
         if results.get('recommendation'):
-            st.markdown(f"""
-            <div style="background: white; border: 2px solid #17a2b8; border-radius: 8px; 
-                        padding: 1.5rem; margin: 1.5rem 0;">
-                <h4 style="color: black; margin-top: 0;">💡 What Should You Do?</h4>
-                <div class="big-text" style="color: black;">
-                    {results['recommendation']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            with st.container(border=True):
+                st.markdown("#### 💡 What Should You Do?")
+                st.markdown(results['recommendation'])
         
         # Add Chat Interface after analysis results
         st.markdown("---")
@@ -483,7 +427,7 @@ else:
         
         # Initialize chat history in session state
         if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = []
+            st.session_state.chat_history = deque(maxlen=CHAT_HISTORY_LIMIT)
         
         # Chat input
         user_question = st.text_input(
@@ -493,13 +437,30 @@ else:
         )
         
         col1, col2 = st.columns([1, 4])
+        # Full-width slot where a fresh answer streams in
+        answer_placeholder = st.empty()
         with col1:
             if st.button("🤖 Ask AI", key="ask_button"):
                 if user_question.strip():
                     # Get AI response
                     with st.spinner("🤖 AI is thinking..."):
                         try:
-                            ai_response = analyzer.chat_with_ai(user_question, platform_display_name)
+                            chat_inputs = {'question': user_question, 'platform': platform_display_name, 'analysis_type': 'chat'}
+                            ai_response = get_cached_response(chat_inputs)
+                            
+                            if ai_response is None:
+                                # Show the answer as it is generated instead of after the last token
+                                ai_response = ""
+                                try:
+                                    for chunk in analyzer.stream_chat(user_question, platform_display_name):
+                                        ai_response += chunk
+                                        answer_placeholder.markdown(ai_response)
+                                except Exception:
+                                    # Cut off midway: neither keep nor cache the partial answer
+                                    answer_placeholder.empty()
+                                    discard_pending(chat_inputs)
+                                    raise
+                                store_response(chat_inputs, ai_response)
                             
                             # Add to chat history
                             st.session_state.chat_history.append({
@@ -518,7 +479,7 @@ else:
         
         with col2:
             if st.button("🗑️ Clear Chat", key="clear_chat"):
-                st.session_state.chat_history = []
+                st.session_state.chat_history.clear()
                 st.rerun()
         
         # Display chat history
@@ -526,20 +487,12 @@ else:
             st.markdown("#### 💭 Chat History")
             
             # Show recent chats (last 5)
-            recent_chats = st.session_state.chat_history[-5:]
-            
-            for i, chat in enumerate(reversed(recent_chats)):
-                with st.expander(f"Q: {chat['question'][:50]}{'...' if len(chat['question']) > 50 else ''}", expanded=(i==0)):
-                    st.markdown(f"""
-                    <div style="background: #f8f9fa; padding: 1rem; border-radius: 8px; margin: 0.5rem 0;">
-                        <strong>❓ Your Question:</strong><br>
-                        {chat['question']}
-                    </div>
-                    <div style="background: #e3f2fd; padding: 1rem; border-radius: 8px; margin: 0.5rem 0;">
-                        <strong>🤖 AI Response:</strong><br>
-                        {chat['response']}
-                    </div>
-                    """, unsafe_allow_html=True)
+            recent_chats = list(islice(reversed(st.session_state.chat_history), 5))
+            for chat in reversed(recent_chats):
+                with st.chat_message("user"):
+                    st.markdown(chat['question'])
+                with st.chat_message("assistant"):
+                    st.markdown(chat['response'])
         
         # Suggested questions
         st.markdown("#### 💡 Suggested Questions")
@@ -562,14 +515,7 @@ else:
     
     else:
         # Call to action
-        st.markdown("""
-        <div style="text-align: center; padding: 3rem; background-color: white; color: black;">
-            <h3 style="color: black;">👆 Click the button above to see what's dangerous</h3>
-            <p style="font-size: 1.1rem; color: black;">
-                Our AI will read the privacy policy and highlight only the concerning parts.
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_tpl('cta'), unsafe_allow_html=True)
 
 # Database Statistics (Admin Section)
 if st.checkbox("🔧 Show Admin Statistics", value=False):
@@ -594,18 +540,27 @@ if st.checkbox("🔧 Show Admin Statistics", value=False):
         history = db.get_analysis_history(10)
         
         if history:
-            import pandas as pd
-            df = pd.DataFrame(history)
+            df = _pd().DataFrame(history)
             st.dataframe(df, use_container_width=True)
         else:
             st.info("No analysis history yet")
         
+        # Cache effectiveness (this Streamlit process)
+        st.markdown("#### ⚡ Cache Statistics")
+        stats_by_cache = cache_stats()
+        
+        if stats_by_cache:
+            st.dataframe([{'cache': name, **cache_info} for name, cache_info in stats_by_cache.items()],
+                         use_container_width=True)
+        else:
+            st.info("No cache activity yet")
+        
         # Platform statistics
         st.markdown("#### 🏆 Platform Statistics")
         platform_stats = db.get_platform_stats()
         
         if platform_stats:
-            df_platforms = pd.DataFrame(platform_stats)
+            df_platforms = _pd().DataFrame(platform_stats)
             st.dataframe(df_platforms, use_container_width=True)
         else:
             st.info("No platform statistics yet")
@@ -615,8 +570,4 @@ if st.checkbox("🔧 Show Admin Statistics", value=False):
 
 # Footer
 st.markdown("---")
-st.markdown("""
-<div style="text-align: center; padding: 1rem; background-color: white; color: black;">
-    <p style="margin: 0; color: black;">🏆 AWS Hackathon 2025 | Built by Saidul and Almaz and Sakib</p>
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(_tpl('footer'), unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Hit/miss and latency counters for the app's caches
+Covers the Streamlit cache_resource/cache_data wrappers and the response cache
+(API/UI answers as response_cache, Bedrock completions as completion_cache),
+so slow requests can be told apart as cache misses or backend slowness.
+Counters are per process (the Streamlit server and each API worker keep their own).
+"""
+
+import functools
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counts = Counter()
+_last_access: Dict[str, str] = {}
+
+def record_hit(name: str, elapsed: float):
+    """Count a cache hit that took elapsed seconds"""
+    with _lock:
+        _counts[(name, 'hits')] += 1
+        _counts[(name, 'hit_time')] += elapsed
+        _last_access[name] = datetime.now().isoformat(timespec='seconds')
+
+def record_miss(name: str, elapsed: float = None):
+    """Count a cache miss; elapsed is the time spent computing the value, if known"""
+    with _lock:
+        _counts[(name, 'misses')] += 1
+        _last_access[name] = datetime.now().isoformat(timespec='seconds')
+    if elapsed is not None:
+        record_miss_time(name, elapsed)
+
+def record_miss_time(name: str, elapsed: float):
+    """Add compute time for a miss counted earlier (e.g. when its result is stored)"""
+    with _lock:
+        _counts[(name, 'timed_misses')] += 1
+        _counts[(name, 'miss_time')] += elapsed
+
+def instrument(name: str, cache_decorator: Callable) -> Callable:
+    """Apply a st.cache_* decorator and count hits/misses around it"""
+    def decorator(func):
+        state = threading.local()
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            # Only reached when the cache has no stored value
+            state.miss = True
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            state.miss = False
+            start = time.perf_counter()
+            result = cached(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+
+            if state.miss:
+                record_miss(name, elapsed)
+            else:
+                record_hit(name, elapsed)
+            return result
+
+        return wrapper
+    return decorator
+
+def cache_stats() -> Dict[str, Dict]:
+    """Snapshot of the counters, one dict per cache"""
+    with _lock:
+        counts = dict(_counts)
+        last_access = dict(_last_access)
+
+    stats = {}
+    for name in sorted(last_access):
+        hits = counts.get((name, 'hits'), 0)
+        misses = counts.get((name, 'misses'), 0)
+        timed_misses = counts.get((name, 'timed_misses'), 0)
+        avg_hit = counts.get((name, 'hit_time'), 0) / hits if hits else 0
+        avg_miss = counts.get((name, 'miss_time'), 0) / timed_misses if timed_misses else 0
+
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0,
+            'avg_hit_ms': round(avg_hit * 1000, 2),
+            'avg_miss_ms': round(avg_miss * 1000, 2),
+            'time_saved_s': round(hits * max(avg_miss - avg_hit, 0), 2),
+            'last_access': last_access[name]
+        }
+
+    return stats
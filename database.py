@@ -3,23 +3,302 @@ SQLite Database Manager for Privacy Policy Analyzer
 Stores analysis history, cached results, and usage statistics
 """
 
-import sqlite3
-import json
-import datetime
+try:
+    # pysqlite3-binary bundles a current SQLite, independent of the system library
+    import pysqlite3 as sqlite3
+except ImportError:
+    import sqlite3
+import zlib
+import orjson
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+from ttl_cache import TTLCache
+
+# Oldest SQLite with every feature the schema and queries use (STRICT tables)
+MIN_SQLITE_VERSION = (3, 37, 0)
+
+if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+    raise RuntimeError(
+        f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))}+ is required, found {sqlite3.sqlite_version}; "
+        "install pysqlite3-binary"
+    )
+
+# zlib level for cached analysis blobs (fast, ~4x smaller than the JSON text)
+CACHE_COMPRESSION_LEVEL = 6
+
+# Background cache cleanup period (seconds) and pages reclaimed per run
+CLEANUP_INTERVAL = 300
+VACUUM_PAGES = 500
+
+# API/chat responses and Bedrock completions are served from response_cache for this long (seconds)
+RESPONSE_CACHE_TTL = 30 * 86400
+
+# Rows kept in response_cache; the cleanup thread drops the oldest beyond this
+RESPONSE_CACHE_MAX_ROWS = 50000
+
+# Timestamps are INTEGER unix seconds; this is "now" in SQL
+NOW_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# Bumped whenever init_database gains a data migration
+SCHEMA_VERSION = 2
+
+# Natural-key lookup tables: one clustered B-tree each, with strict column types.
+# Shared by init_database and the version 2 migration that rebuilds older files.
+ANALYSIS_CACHE_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        website TEXT PRIMARY KEY,
+        company_name TEXT,
+        cached_analysis BLOB,
+        cache_timestamp INTEGER,
+        expires_at INTEGER
+    ) WITHOUT ROWID, STRICT
+'''
+USER_SESSIONS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        session_id TEXT PRIMARY KEY,
+        first_visit INTEGER,
+        last_activity INTEGER,
+        total_analyses INTEGER DEFAULT 0
+    ) WITHOUT ROWID, STRICT
+'''
+SESSION_PLATFORMS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        session_id TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        PRIMARY KEY (session_id, platform)
+    ) WITHOUT ROWID, STRICT
+'''
+
+# Refresh planner statistics for analysis_history after this many inserts
+ANALYZE_EVERY = 10000
+
+# last_analyzed is only bumped once it is this many seconds stale, so most
+# stats upserts leave the column (and its page) unchanged
+LAST_ANALYZED_RESOLUTION = 60
+
+# Most queued platform stats updates applied per write transaction
+STATS_BATCH_SIZE = 100
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Hot-path statements, shared so every call reuses the same prepared statement
+INSERT_ANALYSIS_SQL = f'''
+    INSERT INTO analysis_history 
+    (website, company_name, analysis_type, risk_score, harmful_points, 
+     worst_data, recommendation, privacy_url, source, user_session, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {NOW_SQL})
+'''
+INSERT_ANALYSIS_RETURNING_SQL = INSERT_ANALYSIS_SQL + 'RETURNING id\n'
+# Merges (count, average) into the running average in SQL (SET expressions see the old row values)
+UPSERT_PLATFORM_STATS_SQL = f'''
+    INSERT INTO platform_stats (platform_name, analysis_count, avg_risk_score, last_analyzed)
+    VALUES (?, ?, ?, {NOW_SQL})
+    ON CONFLICT(platform_name) DO UPDATE SET
+        avg_risk_score = (avg_risk_score * analysis_count + excluded.avg_risk_score * excluded.analysis_count)
+                         / (analysis_count + excluded.analysis_count),
+        analysis_count = analysis_count + excluded.analysis_count,
+        last_analyzed = CASE
+            WHEN excluded.last_analyzed - last_analyzed > {LAST_ANALYZED_RESOLUTION} THEN excluded.last_analyzed
+            ELSE last_analyzed
+        END
+'''
+UPSERT_USER_SESSION_SQL = f'''
+    INSERT INTO user_sessions (session_id, total_analyses, first_visit, last_activity)
+    VALUES (?, 1, {NOW_SQL}, {NOW_SQL})
+    ON CONFLICT(session_id) DO UPDATE SET
+        last_activity = excluded.last_activity,
+        total_analyses = total_analyses + 1
+'''
+INSERT_SESSION_PLATFORM_SQL = 'INSERT OR IGNORE INTO session_platforms (session_id, platform) VALUES (?, ?)'
+DASHBOARD_TOTALS_SQL = '''
+    WITH totals AS (
+        SELECT COUNT(*) AS total_analyses,
+               COUNT(DISTINCT website) AS unique_websites,
+               AVG(CASE WHEN risk_score > 0 THEN risk_score END) AS avg_risk,
+               COUNT(CASE WHEN timestamp >= CAST(strftime('%s', 'now', 'start of day') AS INTEGER)
+                          THEN 1 END) AS analyses_today
+        FROM analysis_history
+    )
+    SELECT total_analyses, unique_websites, avg_risk, analyses_today FROM totals
+'''
+# Expiry arithmetic happens in SQL on integer seconds
+CACHE_ANALYSIS_SQL = f'''
+    INSERT OR REPLACE INTO analysis_cache 
+    (website, company_name, cached_analysis, cache_timestamp, expires_at)
+    VALUES (?, ?, ?, {NOW_SQL}, {NOW_SQL} + ?)
+'''
+GET_CACHED_ANALYSIS_SQL = f'''
+    SELECT cached_analysis, expires_at - {NOW_SQL} AS remaining FROM analysis_cache 
+    WHERE website = ? AND expires_at > {NOW_SQL}
+'''
+GET_RESPONSE_SQL = f'''
+    SELECT payload FROM response_cache
+    WHERE key = ? AND created_at > {NOW_SQL} - {RESPONSE_CACHE_TTL}
+'''
+SAVE_RESPONSE_SQL = f'''
+    INSERT OR REPLACE INTO response_cache (key, payload, created_at)
+    VALUES (?, ?, {NOW_SQL})
+'''
+# Oldest rows past RESPONSE_CACHE_MAX_ROWS (walks idx_response_created)
+TRIM_RESPONSES_SQL = '''
+    DELETE FROM response_cache WHERE created_at <= (
+        SELECT created_at FROM response_cache ORDER BY created_at DESC LIMIT 1 OFFSET ?
+    )
+'''
 
 class DatabaseManager:
     """Manages SQLite database for privacy policy analysis data"""
     
     def __init__(self, db_path: str = "privacy_analyzer.db"):
         self.db_path = db_path
+        # One long-lived writer connection shared by all threads; the lock
+        # keeps a single transaction on it at a time
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        
+        # Planner statistics: refreshed after bulk growth and on shutdown
+        self._inserts_since_analyze = 0
+        atexit.register(self._optimize)
+        
         self.init_database()
+        
+        # Read-only connections so SELECTs run in parallel with each other and the writer
+        self.reader_count = min(os.cpu_count() or 4, 16)
+        self._readers = self._open_readers()
+        
+        # Hot cached analyses stay in memory so repeat lookups skip SQLite
+        self._mem_cache = TTLCache(maxsize=1024, ttl=3600)
+        
+        # Expired cache rows are purged in the background, never on a request
+        self._start_cleanup_thread()
+        
+        # Platform stats are queued by the save methods and applied in batches
+        self._stats_q = queue.Queue()
+        threading.Thread(target=self._stats_worker, name='db-stats-writer', daemon=True).start()
+        atexit.register(self._drain_stats)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the shared connection in autocommit mode with WAL and tuned PRAGMAs"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        # Lets the cleanup thread hand freed pages back; must precede the WAL
+        # switch and only takes effect on a new database file
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        return conn
+    
+    def _open_readers(self) -> queue.Queue:
+        """Pool of query_only connections opened with a mode=ro URI"""
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        readers = queue.Queue()
+        
+        for _ in range(self.reader_count):
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            conn.execute('PRAGMA query_only=1')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA mmap_size=268435456')
+            readers.put(conn)
+        
+        return readers
+    
+    def _start_cleanup_thread(self):
+        threading.Thread(target=self._cleanup_loop, name='db-cache-cleanup', daemon=True).start()
+    
+    def _cleanup_loop(self):
+        """Every CLEANUP_INTERVAL seconds drop expired cache rows and reclaim some free pages"""
+        while True:
+            time.sleep(CLEANUP_INTERVAL)
+            try:
+                deleted = self.cleanup_expired_cache()
+                with self._lock:
+                    self._conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_PAGES})')
+                if deleted:
+                    print(f"🧹 Removed {deleted} expired cache entries")
+            except Exception as e:
+                print(f"Cache cleanup error: {e}")
+    
+    def _stats_worker(self):
+        """Apply queued platform stats updates, coalescing whatever has piled up"""
+        while True:
+            batch = [self._stats_q.get()]
+            self._apply_stats(batch)
+    
+    def _drain_stats(self):
+        """Apply anything still queued before the process exits"""
+        self._apply_stats([])
+    
+    def _apply_stats(self, batch: List[tuple]):
+        """Write a batch of (platform, score) updates in one transaction"""
+        try:
+            while len(batch) < STATS_BATCH_SIZE:
+                batch.append(self._stats_q.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if not batch:
+            return
+        
+        # Per-platform (count, score total) so each platform gets one UPSERT
+        platform_totals = {}
+        for platform_name, risk_score in batch:
+            count, total = platform_totals.get(platform_name, (0, 0))
+            platform_totals[platform_name] = (count + 1, total + risk_score)
+        
+        try:
+            with self._transaction() as cursor:
+                cursor.executemany(UPSERT_PLATFORM_STATS_SQL, [
+                    (platform_name, count, total / count)
+                    for platform_name, (count, total) in platform_totals.items()
+                ])
+        except Exception as e:
+            print(f"Platform stats update error: {e}")
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the block as one BEGIN IMMEDIATE ... COMMIT write transaction"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+            
+            if self._inserts_since_analyze >= ANALYZE_EVERY:
+                self._inserts_since_analyze = 0
+                cursor.execute('ANALYZE analysis_history')
+    
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Cursor]:
+        """Check a reader connection out of the pool for the duration of the block"""
+        conn = self._readers.get()
+        try:
+            yield conn.cursor()
+        finally:
+            self._readers.put(conn)
     
     def init_database(self):
         """Initialize database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self._transaction() as cursor:
+            # A brand-new file is created at the current schema; older files are migrated first
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'")
+            if cursor.fetchone()[0]:
+                self._migrate(cursor)
+            else:
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
             
             # Analysis history table
             cursor.execute('''
@@ -34,7 +313,7 @@ class DatabaseManager:
                     recommendation TEXT,
                     privacy_url TEXT,
                     source TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    timestamp INTEGER,
                     user_session TEXT
                 )
             ''')
@@ -46,240 +325,269 @@ class DatabaseManager:
                     platform_name TEXT UNIQUE,
                     analysis_count INTEGER DEFAULT 0,
                     avg_risk_score REAL,
-                    last_analyzed DATETIME,
+                    last_analyzed INTEGER,
                     total_users INTEGER DEFAULT 0
                 )
             ''')
             
             # Cached analysis results
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS analysis_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    website TEXT UNIQUE,
-                    company_name TEXT,
-                    cached_analysis TEXT,
-                    cache_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    expires_at DATETIME
-                )
-            ''')
+            cursor.execute(ANALYSIS_CACHE_DDL.format(table='analysis_cache'))
             
             # User sessions (for analytics)
+            cursor.execute(USER_SESSIONS_DDL.format(table='user_sessions'))
+            
+            # Platforms analyzed per session
+            cursor.execute(SESSION_PLATFORMS_DDL.format(table='session_platforms'))
+            
+            # Deterministic API/chat response cache (see response_cache.py)
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    session_id TEXT PRIMARY KEY,
-                    first_visit DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    last_activity DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    total_analyses INTEGER DEFAULT 0,
-                    platforms_analyzed TEXT
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB,
+                    created_at INTEGER
                 )
             ''')
             
-            conn.commit()
-            print("✅ Database initialized successfully")
+            # Indexes for the history listing, dashboard and cache lookups
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_ts ON analysis_history(timestamp DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_company_ts ON analysis_history(company_name, timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cache_expiring ON analysis_cache(expires_at) WHERE expires_at IS NOT NULL')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_response_created ON response_cache(created_at)')
+            
+            # Gather planner statistics the first time, then let optimize top them up
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            cursor.execute('ANALYZE' if cursor.fetchone()[0] == 0 else 'PRAGMA optimize')
+            
+        print("✅ Database initialized successfully")
+    
+    def _migrate(self, cursor: sqlite3.Cursor):
+        """Bring an older database file up to SCHEMA_VERSION"""
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        
+        if version < 1:
+            # ISO text timestamps -> INTEGER unix seconds
+            for table, columns in (
+                ('analysis_history', ('timestamp',)),
+                ('platform_stats', ('last_analyzed',)),
+                ('analysis_cache', ('cache_timestamp', 'expires_at')),
+                ('user_sessions', ('first_visit', 'last_activity')),
+            ):
+                for column in columns:
+                    cursor.execute(f'''
+                        UPDATE {table} SET {column} = CAST(strftime('%s', {column}) AS INTEGER)
+                        WHERE typeof({column}) = 'text'
+                    ''')
+        
+        if version < 2:
+            # Move CSV platform lists into session_platforms
+            cursor.execute(SESSION_PLATFORMS_DDL.format(table='session_platforms'))
+            cursor.execute("SELECT session_id, platforms_analyzed FROM user_sessions WHERE platforms_analyzed <> ''")
+            cursor.executemany(INSERT_SESSION_PLATFORM_SQL, [
+                (session_id, platform)
+                for session_id, platforms in cursor.fetchall()
+                for platform in platforms.split(',') if platform
+            ])
+            
+            # Rebuild the lookup tables as WITHOUT ROWID, STRICT (JSON-text cache rows are dropped)
+            for table, ddl, columns, where in (
+                ('analysis_cache', ANALYSIS_CACHE_DDL,
+                 "website, company_name, cached_analysis, CAST(cache_timestamp AS INTEGER), CAST(expires_at AS INTEGER)",
+                 "website IS NOT NULL AND typeof(cached_analysis) = 'blob'"),
+                ('user_sessions', USER_SESSIONS_DDL,
+                 "session_id, CAST(first_visit AS INTEGER), CAST(last_activity AS INTEGER), total_analyses",
+                 "session_id IS NOT NULL"),
+                ('session_platforms', SESSION_PLATFORMS_DDL, "session_id, platform", "1"),
+            ):
+                cursor.execute(ddl.format(table=f'{table}_v2'))
+                cursor.execute(f'INSERT OR REPLACE INTO {table}_v2 SELECT {columns} FROM {table} WHERE {where}')
+                cursor.execute(f'DROP TABLE {table}')
+                cursor.execute(f'ALTER TABLE {table}_v2 RENAME TO {table}')
+        
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     
     def save_analysis(self, analysis_data: Dict, session_id: str = None) -> int:
         """Save analysis result to database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO analysis_history 
-                (website, company_name, analysis_type, risk_score, harmful_points, 
-                 worst_data, recommendation, privacy_url, source, user_session)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                analysis_data.get('website', ''),
-                analysis_data.get('company_name', ''),
-                analysis_data.get('analysis_type', 'unknown'),
-                analysis_data.get('score', 0),
-                analysis_data.get('harmful_points', ''),
-                analysis_data.get('worst_data', ''),
-                analysis_data.get('recommendation', ''),
-                analysis_data.get('privacy_url', ''),
-                analysis_data.get('source', 'unknown'),
-                session_id
-            ))
-            
-            analysis_id = cursor.lastrowid
-            conn.commit()
-            
-            # Update platform statistics
-            self.update_platform_stats(analysis_data.get('company_name', ''), 
-                                     analysis_data.get('score', 0))
-            
-            return analysis_id
+        with self._transaction() as cursor:
+            analysis_id = self._insert_analysis(cursor, analysis_data, session_id)
+        
+        # Platform statistics are written by the stats thread
+        self._queue_platform_stats(analysis_data)
+        return analysis_id
+    
+    def save_with_session(self, analysis_data: Dict, session_id: str, company_name: str = None) -> int:
+        """Save an analysis and bump the user's session in a single transaction"""
+        with self._transaction() as cursor:
+            analysis_id = self._insert_analysis(cursor, analysis_data, session_id)
+            self._update_user_session(cursor, session_id, 
+                                      company_name or analysis_data.get('company_name'))
+        
+        self._queue_platform_stats(analysis_data)
+        return analysis_id
+    
+    def save_analysis_bulk(self, analyses: List[Dict], session_id: str = None) -> int:
+        """Save many analyses (e.g. a replayed backlog) in one transaction"""
+        if not analyses:
+            return 0
+        
+        # Per-platform (count, score total) so each platform gets one stats UPSERT
+        platform_totals = {}
+        for analysis_data in analyses:
+            platform_name = analysis_data.get('company_name', '')
+            if platform_name:
+                count, total = platform_totals.get(platform_name, (0, 0))
+                platform_totals[platform_name] = (count + 1, total + analysis_data.get('score', 0))
+        
+        with self._transaction() as cursor:
+            cursor.executemany(INSERT_ANALYSIS_SQL, 
+                               [self._analysis_row(analysis_data, session_id) for analysis_data in analyses])
+            self._inserts_since_analyze += len(analyses)
+            cursor.executemany(UPSERT_PLATFORM_STATS_SQL, [
+                (platform_name, count, total / count)
+                for platform_name, (count, total) in platform_totals.items()
+            ])
+        
+        return len(analyses)
+    
+    def _optimize(self):
+        """Let SQLite refresh any stale statistics before the process exits"""
+        try:
+            with self._lock:
+                self._conn.execute('PRAGMA optimize')
+        except sqlite3.Error as e:
+            print(f"PRAGMA optimize failed: {e}")
+    
+    def _analysis_row(self, analysis_data: Dict, session_id: str = None) -> tuple:
+        """Parameters for INSERT_ANALYSIS_SQL"""
+        return (
+            analysis_data.get('website', ''),
+            analysis_data.get('company_name', ''),
+            analysis_data.get('analysis_type', 'unknown'),
+            analysis_data.get('score', 0),
+            analysis_data.get('harmful_points', ''),
+            analysis_data.get('worst_data', ''),
+            analysis_data.get('recommendation', ''),
+            analysis_data.get('privacy_url', ''),
+            analysis_data.get('source', 'unknown'),
+            session_id
+        )
+    
+    def _insert_analysis(self, cursor: sqlite3.Cursor, analysis_data: Dict, session_id: str = None) -> int:
+        """Insert one analysis_history row"""
+        cursor.execute(INSERT_ANALYSIS_RETURNING_SQL, self._analysis_row(analysis_data, session_id))
+        self._inserts_since_analyze += 1
+        return cursor.fetchone()[0]
+    
+    def _queue_platform_stats(self, analysis_data: Dict):
+        """Hand a stats update to the background writer"""
+        platform_name = analysis_data.get('company_name', '')
+        if platform_name:
+            self._stats_q.put((platform_name, analysis_data.get('score', 0)))
     
     def update_platform_stats(self, platform_name: str, risk_score: int):
         """Update platform analysis statistics"""
+        with self._transaction() as cursor:
+            self._update_platform_stats(cursor, platform_name, risk_score)
+    
+    def _update_platform_stats(self, cursor: sqlite3.Cursor, platform_name: str, risk_score: int):
+        """Update platform statistics using the caller's transaction"""
         if not platform_name:
             return
-            
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Check if platform exists
-            cursor.execute('SELECT * FROM platform_stats WHERE platform_name = ?', (platform_name,))
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update existing record
-                new_count = existing[2] + 1
-                new_avg = ((existing[3] * existing[2]) + risk_score) / new_count
-                
-                cursor.execute('''
-                    UPDATE platform_stats 
-                    SET analysis_count = ?, avg_risk_score = ?, last_analyzed = CURRENT_TIMESTAMP
-                    WHERE platform_name = ?
-                ''', (new_count, new_avg, platform_name))
-            else:
-                # Insert new record
-                cursor.execute('''
-                    INSERT INTO platform_stats (platform_name, analysis_count, avg_risk_score, last_analyzed)
-                    VALUES (?, 1, ?, CURRENT_TIMESTAMP)
-                ''', (platform_name, risk_score))
-            
-            conn.commit()
+        
+        cursor.execute(UPSERT_PLATFORM_STATS_SQL, (platform_name, 1, risk_score))
     
     def get_analysis_history(self, limit: int = 50) -> List[Dict]:
         """Get recent analysis history"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
+        with self._read() as cursor:
+            cursor.row_factory = sqlite3.Row
             cursor.execute('''
-                SELECT website, company_name, risk_score, source, timestamp
+                SELECT website, company_name, risk_score, source,
+                       datetime(timestamp, 'unixepoch') AS timestamp
                 FROM analysis_history 
-                ORDER BY timestamp DESC 
+                ORDER BY analysis_history.timestamp DESC 
                 LIMIT ?
             ''', (limit,))
             
-            results = cursor.fetchall()
-            
-            return [
-                {
-                    'website': row[0],
-                    'company_name': row[1],
-                    'risk_score': row[2],
-                    'source': row[3],
-                    'timestamp': row[4]
-                }
-                for row in results
-            ]
+            return [dict(row) for row in cursor]
     
     def get_platform_stats(self) -> List[Dict]:
         """Get platform analysis statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
+        with self._read() as cursor:
+            cursor.row_factory = sqlite3.Row
             cursor.execute('''
-                SELECT platform_name, analysis_count, avg_risk_score, last_analyzed
+                SELECT platform_name AS platform, analysis_count AS analyses,
+                       IFNULL(ROUND(avg_risk_score, 1), 0) AS avg_risk,
+                       datetime(last_analyzed, 'unixepoch') AS last_analyzed
                 FROM platform_stats 
                 ORDER BY analysis_count DESC
             ''')
             
-            results = cursor.fetchall()
-            
-            return [
-                {
-                    'platform': row[0],
-                    'analyses': row[1],
-                    'avg_risk': round(row[2], 1) if row[2] else 0,
-                    'last_analyzed': row[3]
-                }
-                for row in results
-            ]
+            return [dict(row) for row in cursor]
     
     def cache_analysis(self, website: str, analysis: Dict, expires_hours: int = 24):
         """Cache analysis result for faster future lookups"""
-        expires_at = datetime.datetime.now() + datetime.timedelta(hours=expires_hours)
+        ttl = expires_hours * 3600
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO analysis_cache 
-                (website, company_name, cached_analysis, expires_at)
-                VALUES (?, ?, ?, ?)
-            ''', (
+        with self._transaction() as cursor:
+            cursor.execute(CACHE_ANALYSIS_SQL, (
                 website,
                 analysis.get('company_name', ''),
-                json.dumps(analysis),
-                expires_at
+                zlib.compress(orjson.dumps(analysis), CACHE_COMPRESSION_LEVEL),
+                ttl
             ))
-            
-            conn.commit()
+        
+        # Pre-warm the in-memory layer for readers in this process
+        self._mem_cache.set(website, analysis, ttl)
     
     def get_cached_analysis(self, website: str) -> Optional[Dict]:
         """Get cached analysis if available and not expired"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT cached_analysis FROM analysis_cache 
-                WHERE website = ? AND expires_at > CURRENT_TIMESTAMP
-            ''', (website,))
+        analysis = self._mem_cache.get(website)
+        if analysis is not None:
+            return analysis
+        
+        with self._read() as cursor:
+            cursor.execute(GET_CACHED_ANALYSIS_SQL, (website,))
             
             result = cursor.fetchone()
             
             if result:
-                return json.loads(result[0])
+                analysis = orjson.loads(zlib.decompress(result[0]))
+                self._mem_cache.set(website, analysis, result[1])
+                return analysis
             
             return None
     
+    def get_cached_response(self, key: str) -> Optional[bytes]:
+        """Get a cached API/chat response payload by its request hash"""
+        with self._read() as cursor:
+            cursor.execute(GET_RESPONSE_SQL, (key,))
+            result = cursor.fetchone()
+            
+            return result[0] if result else None
+    
+    def save_cached_response(self, key: str, payload: bytes):
+        """Store an API/chat response payload under its request hash"""
+        with self._transaction() as cursor:
+            cursor.execute(SAVE_RESPONSE_SQL, (key, payload))
+    
     def update_user_session(self, session_id: str, platform_analyzed: str = None):
         """Update user session statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Check if session exists
-            cursor.execute('SELECT * FROM user_sessions WHERE session_id = ?', (session_id,))
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update existing session
-                total_analyses = existing[3] + 1
-                platforms = existing[4].split(',') if existing[4] else []
-                
-                if platform_analyzed and platform_analyzed not in platforms:
-                    platforms.append(platform_analyzed)
-                
-                cursor.execute('''
-                    UPDATE user_sessions 
-                    SET last_activity = CURRENT_TIMESTAMP, total_analyses = ?, platforms_analyzed = ?
-                    WHERE session_id = ?
-                ''', (total_analyses, ','.join(platforms), session_id))
-            else:
-                # Create new session
-                platforms = [platform_analyzed] if platform_analyzed else []
-                cursor.execute('''
-                    INSERT INTO user_sessions (session_id, total_analyses, platforms_analyzed)
-                    VALUES (?, 1, ?)
-                ''', (session_id, ','.join(platforms)))
-            
-            conn.commit()
+        with self._transaction() as cursor:
+            self._update_user_session(cursor, session_id, platform_analyzed)
+    
+    def _update_user_session(self, cursor: sqlite3.Cursor, session_id: str, platform_analyzed: str = None):
+        """Update session statistics using the caller's transaction"""
+        cursor.execute(UPSERT_USER_SESSION_SQL, (session_id,))
+        
+        if platform_analyzed:
+            cursor.execute(INSERT_SESSION_PLATFORM_SQL, (session_id, platform_analyzed))
     
     def get_dashboard_stats(self) -> Dict:
         """Get statistics for admin dashboard"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Total analyses
-            cursor.execute('SELECT COUNT(*) FROM analysis_history')
-            total_analyses = cursor.fetchone()[0]
-            
-            # Unique websites analyzed
-            cursor.execute('SELECT COUNT(DISTINCT website) FROM analysis_history')
-            unique_websites = cursor.fetchone()[0]
-            
-            # Average risk score
-            cursor.execute('SELECT AVG(risk_score) FROM analysis_history WHERE risk_score > 0')
-            avg_risk = cursor.fetchone()[0] or 0
-            
-            # Analyses today
-            cursor.execute('''
-                SELECT COUNT(*) FROM analysis_history 
-                WHERE DATE(timestamp) = DATE('now')
-            ''')
-            analyses_today = cursor.fetchone()[0]
+        with self._read() as cursor:
+            # Totals, unique websites, average risk and today's count in one pass
+            cursor.execute(DASHBOARD_TOTALS_SQL)
+            total_analyses, unique_websites, avg_risk, analyses_today = cursor.fetchone()
+            avg_risk = avg_risk or 0
             
             # Most analyzed platforms
             cursor.execute('''
@@ -302,14 +610,37 @@ class DatabaseManager:
     
     def cleanup_expired_cache(self):
         """Remove expired cache entries"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM analysis_cache WHERE expires_at < CURRENT_TIMESTAMP')
+        with self._transaction() as cursor:
+            cursor.execute(f'DELETE FROM analysis_cache WHERE expires_at < {NOW_SQL}')
             deleted = cursor.rowcount
-            conn.commit()
+            
+            cursor.execute(f'DELETE FROM response_cache WHERE created_at <= {NOW_SQL} - {RESPONSE_CACHE_TTL}')
+            deleted += cursor.rowcount
+            
+            cursor.execute(TRIM_RESPONSES_SQL, (RESPONSE_CACHE_MAX_ROWS,))
+            deleted += cursor.rowcount
             
             return deleted
 
-# Global database instance
-db = DatabaseManager()
+# One manager per database file per process; the lock stops concurrent first
+# calls from each building their own (connections, threads, atexit hooks)
+_managers: Dict[str, DatabaseManager] = {}
+_managers_lock = threading.Lock()
+
+def get_db(path: str = "privacy_analyzer.db") -> DatabaseManager:
+    """Per-process database manager, created on first use"""
+    manager = _managers.get(path)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(path)
+            if manager is None:
+                manager = _managers[path] = DatabaseManager(path)
+    return manager
+
+def _forget_managers():
+    """A forked worker (gunicorn preload) must open its own connections, not reuse the parent's"""
+    global _managers_lock
+    _managers_lock = threading.Lock()
+    _managers.clear()
+
+os.register_at_fork(after_in_child=_forget_managers)
@@ -122,7 +122,8 @@ git clone https://github.com/your-repo/privacy-policy-analyzer.git || {
 }
 
 # Install Python dependencies
-pip3 install streamlit boto3 flask flask-cors requests beautifulsoup4 pandas pillow
+pip3 install streamlit boto3 flask flask-cors gunicorn orjson requests beautifulsoup4 lxml pandas numpy pillow \
+    'pysqlite3-binary; sys_platform == "linux" and platform_machine == "x86_64" and python_version < "3.12"'
 
 # Create systemd service
 cat > /etc/systemd/system/privacy-analyzer.service << 'EOFSERVICE'
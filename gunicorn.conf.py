@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for the Privacy Policy Analyzer API
+/api/analyze and /api/chat spend most of their time waiting on the scraper
+and Bedrock, so each worker runs a thread pool instead of one request at a time
+"""
+
+import os
+
+bind = os.getenv('API_BIND', '0.0.0.0:8502')
+workers = int(os.getenv('API_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('API_THREADS', '8'))
+
+# Scrape + LLM analysis can take well over the default 30s
+timeout = 120
+
+# Import wsgi (analyzer, scraper) once in the master and fork
+# workers from it, rather than every worker repeating the start-up work
+preload_app = True
+
+def post_fork(server, worker):
+    """Give each worker its own Bedrock client (warmed up here) and database connections (neither is fork-safe)"""
+    import wsgi
+    wsgi.analyzer.bedrock_client = wsgi.analyzer._init_bedrock()
+    
+    # Open this worker's database before its request threads start
+    from database import get_db
+    get_db()
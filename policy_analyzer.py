@@ -1,55 +1,258 @@
-import json
+import functools
+import orjson
 import os
+import re
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping
 import boto3
+from botocore.config import Config
 from dotenv import load_dotenv
+from rate_limiter import bedrock_bucket, estimate_tokens
+from database import RESPONSE_CACHE_TTL
+from ttl_cache import TTLCache
+from response_cache import cached_call, discard_pending, get_cached_response, mark_degraded, store_response
 
 load_dotenv()
 
+BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
+AWS_REGION = os.getenv('AWS_REGION', 'eu-north-1')
+
+# Distinct (prompt, max_tokens) completions each analyzer keeps in memory
+BEDROCK_CACHE_SIZE = 1024
+
+# Policies summarized per Bedrock request in summarize_policies (500 output tokens each)
+SUMMARY_BATCH_SIZE = 8
+
+# One long-lived client per process: pooled keep-alive connections so request
+# threads reuse TLS sessions, adaptive retries instead of failing on throttles
+BEDROCK_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'max_attempts': 5, 'mode': 'adaptive'},
+    connect_timeout=3,
+    read_timeout=60,
+    tcp_keepalive=True
+)
+
+# Keyword -> data type reported by _extract_data_types_from_text, in report order
+DATA_TYPE_KEYWORDS = (
+    ("email", "Email Address"),
+    ("phone", "Phone Number"),
+    ("location", "Location Data"),
+    ("photo", "Photos"),
+    ("message", "Messages"),
+    ("contact", "Contacts"),
+    ("device", "Device Information"),
+    ("ip address", "IP Address"),
+    ("cookie", "Cookies"),
+    ("browsing", "Browsing History"),
+    ("payment", "Payment Information"),
+    ("biometric", "Biometric Data"),
+    ("voice", "Voice Data"),
+    ("video", "Video Data"),
+    ("search", "Search History"),
+    ("preference", "User Preferences")
+)
+
+# Concerning practices in scraped text: (terms, description, risk added to the score)
+CONCERNING_PRACTICES = (
+    (('sell', 'selling', 'sold'), "may sell your personal data", 25),
+    (('third party', 'third-party', 'partners'), "shares data with third parties", 15),
+    (('track', 'tracking', 'monitor'), "tracks your online behavior", 15),
+    (('location', 'gps', 'geolocation'), "collects location data", 10),
+    (('biometric', 'facial', 'fingerprint'), "collects biometric data", 20),
+    (('indefinitely', 'permanently', 'forever'), "retains data indefinitely", 15)
+)
+
+# Good practices in scraped text: (terms, risk taken off the score)
+GOOD_PRACTICES = (
+    (('gdpr', 'data protection', 'user rights'), 10),
+    (('delete', 'deletion', 'remove data'), 5),
+    (('opt out', 'opt-out', 'unsubscribe'), 5)
+)
+
+# Data mentioned in scraped text: (terms, description)
+SCRAPED_DATA_TYPES = (
+    (('email', 'e-mail'), "email addresses"),
+    (('phone', 'telephone', 'mobile'), "phone numbers"),
+    (('photo', 'image', 'picture'), "photos and images"),
+    (('message', 'chat', 'communication'), "messages and communications"),
+    (('browsing', 'website', 'web'), "browsing history")
+)
+
+_POLICY_TERMS = frozenset(
+    [keyword for keyword, _ in DATA_TYPE_KEYWORDS]
+    + [term for terms, _, _ in CONCERNING_PRACTICES for term in terms]
+    + [term for terms, _ in GOOD_PRACTICES + SCRAPED_DATA_TYPES for term in terms]
+)
+
+@functools.lru_cache(maxsize=16)
+def policy_terms(policy_text: str) -> frozenset:
+    """Every known keyword present in the policy, found with one lowercase and one pass"""
+    text_lower = policy_text.lower()
+    return frozenset(term for term in _POLICY_TERMS if term in text_lower)
+
+# Data type categories for get_data_collection_map, checked in order; anything
+# matching none of them is Social
+DATA_CATEGORY_PATTERNS = (
+    ("Personal", re.compile(r"photo|name|email|location", re.IGNORECASE)),
+    ("Behavioral", re.compile(r"usage|swipe|interaction|browsing", re.IGNORECASE)),
+    ("Technical", re.compile(r"device|ip|browser", re.IGNORECASE))
+)
+
+# Section headings in a Bedrock harmful-points answer, checked in order against
+# each lowercased line
+RESPONSE_SECTION_PATTERNS = (
+    ("harmful", re.compile(r"1\.|harmful|concerning")),
+    ("data", re.compile(r"2\.|data|collect")),
+    ("recommendation", re.compile(r"3\.|recommend"))
+)
+
+def _frozen(table: Dict[str, Dict]) -> Mapping:
+    """Read-only platform -> details table, built once at import"""
+    return MappingProxyType({name: MappingProxyType(details) for name, details in table.items()})
+
+# Demo policies for platforms without a data/policies file
+MOCK_POLICIES = _frozen({
+    "Tinder": {
+        "text": "Tinder collects personal data including photos, messages, location, and usage patterns...",
+        "data_types": ["Photos", "Messages", "Location", "Device Info", "Usage Patterns", "Swipe History"],
+        "sharing": "Shares with Match Group companies and advertising partners",
+        "retention": "Retains data indefinitely unless deleted"
+    },
+    "Facebook": {
+        "text": "Facebook collects extensive data including posts, likes, friends, and browsing activity...",
+        "data_types": ["Posts", "Photos", "Friends List", "Likes", "Location", "Browsing History", "Ad Interactions"],
+        "sharing": "Shares with Meta companies, advertisers, and third-party apps",
+        "retention": "Retains most data permanently"
+    },
+    "Finn.no": {
+        "text": "Finn.no collects personal information to provide marketplace services, including contact details, location for listings, and usage data. As a Norwegian company, Finn follows strict GDPR compliance and privacy-by-design principles.",
+        "data_types": ["Name & Contact Info", "Location Data", "Listing Information", "Search History", "Device Information", "Usage Analytics"],
+        "sharing": "Limited sharing with service providers and advertisers. No data sold to third parties",
+        "retention": "Data retained as long as account is active, deleted upon request"
+    },
+    "Instagram": {
+        "text": "Instagram collects photos, videos, messages, and extensive behavioral data for advertising purposes...",
+        "data_types": ["Photos", "Videos", "Stories", "Messages", "Location", "Browsing Behavior", "Ad Interactions"],
+        "sharing": "Shares extensively with Meta companies and advertising partners",
+        "retention": "Retains data indefinitely for business purposes"
+    },
+    "TikTok": {
+        "text": "TikTok collects video content, biometric data, device information, and behavioral patterns...",
+        "data_types": ["Videos", "Biometric Data", "Voice Data", "Location", "Device Info", "Browsing History", "Contacts"],
+        "sharing": "Shares with ByteDance companies and may transfer data internationally",
+        "retention": "Retains data for business operations and legal compliance"
+    },
+    "WhatsApp": {
+        "text": "WhatsApp collects metadata, contact information, and usage data while providing end-to-end encryption for messages...",
+        "data_types": ["Phone Number", "Contacts", "Profile Info", "Message Metadata", "Location", "Device Info"],
+        "sharing": "Shares metadata with Meta companies for advertising on other platforms",
+        "retention": "Messages stored on device, metadata retained by company"
+    }
+})
+
+# Hand-written harmful-point summaries used when Bedrock is unavailable
+HARMFUL_FALLBACKS = _frozen({
+    "Tinder": {
+        "harmful_points": "Tinder collects your exact location, biometric data from photos, and tracks your swiping patterns to create detailed behavioral profiles. They share this intimate data with Match Group's 45+ companies and keep it indefinitely even after you delete your account.",
+        "worst_data": "Your precise location, facial recognition data, and detailed records of who you're attracted to - creating a comprehensive profile of your romantic preferences and physical movements.",
+        "recommendation": "Turn off location services, avoid uploading clear face photos, and regularly delete your account if you're not actively using it."
+    },
+    "Facebook": {
+        "harmful_points": "Facebook tracks your activity across the entire internet, builds shadow profiles of non-users through your contacts, and uses psychological manipulation techniques to increase engagement. They collect data even when you're not using Facebook.",
+        "worst_data": "Complete browsing history across all websites, real-time location tracking, and psychological profiling data used to influence your behavior and political views.",
+        "recommendation": "Use Facebook in a separate browser, turn off all location tracking, and regularly review what data they have on you."
+    },
+    "Instagram": {
+        "harmful_points": "Instagram analyzes your photos using AI to detect your emotions, relationships, and lifestyle patterns. They track how long you look at each post to manipulate your feed and keep you addicted to the platform.",
+        "worst_data": "AI analysis of your photos revealing personal relationships, mental health patterns, and detailed behavioral data used for algorithmic manipulation.",
+        "recommendation": "Limit photo uploads with people in them, turn off activity tracking, and use time limits to avoid algorithmic manipulation."
+    },
+    "TikTok": {
+        "harmful_points": "TikTok collects biometric data including face and voice prints, accesses your clipboard without permission, and may share data with the Chinese government. They track your behavior even when the app is closed.",
+        "worst_data": "Biometric identifiers (face, voice, keystroke patterns), clipboard contents, and detailed behavioral data that could be accessed by foreign governments.",
+        "recommendation": "Avoid using TikTok for sensitive communications, turn off microphone access, and consider the geopolitical risks of your data being in China."
+    },
+    "WhatsApp": {
+        "harmful_points": "While messages are encrypted, WhatsApp collects extensive metadata about who you talk to, when, and for how long. This metadata is shared with Facebook for advertising and can reveal your social network and behavior patterns.",
+        "worst_data": "Complete social network mapping, communication patterns, and location data that reveals your daily routines and relationships.",
+        "recommendation": "Use Signal for sensitive conversations, turn off read receipts and last seen, and limit location sharing."
+    },
+    "Finn.no": {
+        "harmful_points": "Finn.no tracks your search history and browsing patterns to build detailed profiles of your interests, income level, and life situation. This data is shared with advertising partners and could be used for price discrimination.",
+        "worst_data": "Detailed financial profiling based on what you search for and buy, revealing your economic situation and personal needs.",
+        "recommendation": "Use private browsing mode, avoid searching for sensitive items when not serious about buying, and regularly clear your search history."
+    }
+})
+
+@dataclass(frozen=True)
+class PolicyView:
+    """A loaded policy plus the score and summaries derived from it"""
+    policy: Mapping
+    sharing: str    # lowercased policy['sharing']
+    retention: str  # lowercased policy['retention']
+    score: int
+    concerns: str
+    positives: str
+
 class PolicyAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: bool = True, warm: bool = True):
         self.policies_dir = Path("data/policies")
-        self.bedrock_client = self._init_bedrock()
-        
-    def _init_bedrock(self):
+        # warm=False skips the background warm-up call (e.g. in a gunicorn master
+        # that forks workers, which each warm their own client)
+        self.bedrock_client = self._init_bedrock(warm)
+        # Identical prompts (same platform text, same question) reuse the earlier
+        # completion: in memory first, then the response cache shared by all processes
+        self.cache = cache
+        self._completions = TTLCache(maxsize=BEDROCK_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        
+        # Bedrock calls in progress, so concurrent identical prompts share one request
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Parsed policy files keyed by platform, with the mtime they were read at
+        self._policy_cache: Dict[str, tuple] = {}
+        # Derived PolicyView per platform, valid while _load_policy returns the same object
+        self._view_cache: Dict[str, PolicyView] = {}
+        for policy_file in self.policies_dir.glob("*.json"):
+            self._load_policy(policy_file.stem)
+        
+    def _init_bedrock(self, warm: bool = True):
         """Initialize AWS Bedrock client with comprehensive error handling"""
         try:
-            # Try multiple regions for better availability
-            regions = [
-                os.getenv('AWS_REGION', 'eu-north-1'),
-                'us-east-1', 
-                'eu-west-1',
-                'us-west-2'
-            ]
+            client = boto3.client(
+                'bedrock-runtime',
+                region_name=AWS_REGION,
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                config=BEDROCK_CONFIG
+            )
             
-            for region in regions:
-                try:
-                    client = boto3.client(
-                        'bedrock-runtime',
-                        region_name=region,
-                        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-                    )
-                    
-                    # Test the connection with a simple call
-                    # Note: bedrock-runtime doesn't have list_foundation_models
-                    # We'll test with a simple model invocation instead
-                    print(f"✅ Successfully connected to AWS Bedrock in {region}")
-                    return client
-                    
-                except Exception as region_error:
-                    print(f"Failed to connect to {region}: {region_error}")
-                    continue
+            print(f"✅ Successfully connected to AWS Bedrock in {AWS_REGION}")
             
-            print("❌ Could not connect to any AWS region")
-            return None
+            # Open the connection and check the model off the request path
+            if warm:
+                threading.Thread(target=self._warm_bedrock, args=(client,), name='bedrock-warmup', daemon=True).start()
+            return client
             
         except Exception as e:
             print(f"❌ AWS Bedrock initialization failed: {e}")
             print("💡 Running in demo mode with mock responses")
             return None
     
+    def _warm_bedrock(self, client):
+        """One-token invocation so the first real request finds a warm TLS connection"""
+        try:
+            bedrock_bucket.acquire(2)
+            client.invoke_model(modelId=BEDROCK_MODEL_ID, body=self._request_body(".", 1))
+            print(f"✅ Bedrock model {BEDROCK_MODEL_ID} is reachable")
+        except Exception as e:
+            print(f"⚠️ Bedrock warm-up failed: {e}")
+    
     def get_available_platforms(self) -> List[str]:
         """Get list of available platforms"""
         if not self.policies_dir.exists():
@@ -61,64 +264,59 @@ class PolicyAnalyzer:
         """Load policy data for a platform"""
         policy_file = self.policies_dir / f"{platform}.json"
         
-        if policy_file.exists():
-            with open(policy_file, 'r') as f:
-                return json.load(f)
+        try:
+            mtime = policy_file.stat().st_mtime_ns
+        except OSError:
+            # Return mock data if file doesn't exist
+            return self._get_mock_policy(platform)
+        
+        # Reuse the parsed file until it changes on disk (callers only read it)
+        cached = self._policy_cache.get(platform)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        policy = orjson.loads(policy_file.read_bytes())
+        self._policy_cache[platform] = (mtime, policy)
+        return policy
+    
+    def _view(self, platform: str) -> PolicyView:
+        """Score and summarize a platform's policy once per loaded version"""
+        policy = self._load_policy(platform)
+        
+        view = self._view_cache.get(platform)
+        if view is not None and view.policy is policy:
+            return view
+        
+        view = self._make_view(policy)
         
-        # Return mock data if file doesn't exist
-        return self._get_mock_policy(platform)
+        # Unknown platforms get a fresh default policy each time, so only known ones are kept
+        if platform in self._policy_cache or platform in MOCK_POLICIES:
+            self._view_cache[platform] = view
+        return view
+    
+    def _make_view(self, policy: Mapping) -> PolicyView:
+        """Lowercase the sharing/retention text once and derive everything from it"""
+        sharing = policy.get('sharing', '').lower()
+        retention = policy.get('retention', '').lower()
+        
+        return PolicyView(policy, sharing, retention,
+                          self._calculate_score(policy, sharing, retention),
+                          self._extract_concerns(policy, sharing, retention),
+                          self._extract_positives(policy))
     
     def _get_mock_policy(self, platform: str) -> Dict:
         """Generate mock policy data for demo"""
-        mock_policies = {
-            "Tinder": {
-                "text": "Tinder collects personal data including photos, messages, location, and usage patterns...",
-                "data_types": ["Photos", "Messages", "Location", "Device Info", "Usage Patterns", "Swipe History"],
-                "sharing": "Shares with Match Group companies and advertising partners",
-                "retention": "Retains data indefinitely unless deleted"
-            },
-            "Facebook": {
-                "text": "Facebook collects extensive data including posts, likes, friends, and browsing activity...",
-                "data_types": ["Posts", "Photos", "Friends List", "Likes", "Location", "Browsing History", "Ad Interactions"],
-                "sharing": "Shares with Meta companies, advertisers, and third-party apps",
-                "retention": "Retains most data permanently"
-            },
-            "Finn.no": {
-                "text": "Finn.no collects personal information to provide marketplace services, including contact details, location for listings, and usage data. As a Norwegian company, Finn follows strict GDPR compliance and privacy-by-design principles.",
-                "data_types": ["Name & Contact Info", "Location Data", "Listing Information", "Search History", "Device Information", "Usage Analytics"],
-                "sharing": "Limited sharing with service providers and advertisers. No data sold to third parties",
-                "retention": "Data retained as long as account is active, deleted upon request"
-            },
-            "Instagram": {
-                "text": "Instagram collects photos, videos, messages, and extensive behavioral data for advertising purposes...",
-                "data_types": ["Photos", "Videos", "Stories", "Messages", "Location", "Browsing Behavior", "Ad Interactions"],
-                "sharing": "Shares extensively with Meta companies and advertising partners",
-                "retention": "Retains data indefinitely for business purposes"
-            },
-            "TikTok": {
-                "text": "TikTok collects video content, biometric data, device information, and behavioral patterns...",
-                "data_types": ["Videos", "Biometric Data", "Voice Data", "Location", "Device Info", "Browsing History", "Contacts"],
-                "sharing": "Shares with ByteDance companies and may transfer data internationally",
-                "retention": "Retains data for business operations and legal compliance"
-            },
-            "WhatsApp": {
-                "text": "WhatsApp collects metadata, contact information, and usage data while providing end-to-end encryption for messages...",
-                "data_types": ["Phone Number", "Contacts", "Profile Info", "Message Metadata", "Location", "Device Info"],
-                "sharing": "Shares metadata with Meta companies for advertising on other platforms",
-                "retention": "Messages stored on device, metadata retained by company"
-            }
-        }
-        
-        return mock_policies.get(platform, {
+        return MOCK_POLICIES.get(platform) or {
             "text": f"{platform} privacy policy...",
             "data_types": ["Personal Info", "Usage Data", "Device Info"],
             "sharing": "Shares with partners",
             "retention": "Varies by data type"
-        })
+        }
     
     def summarize_policy(self, platform: str) -> Dict:
         """Generate AI summary of privacy policy"""
-        policy = self._load_policy(platform)
+        view = self._view(platform)
+        policy = view.policy
         
         # If Bedrock is available, use it for real summarization
         if self.bedrock_client:
@@ -126,12 +324,29 @@ class PolicyAnalyzer:
         else:
             summary_text = self._generate_mock_summary(platform, policy)
         
+        return self._summary(view, summary_text)
+    
+    def summarize_policies(self, platforms: List[str]) -> Dict[str, Dict]:
+        """summarize_policy for several platforms, sharing Bedrock requests between them"""
+        views = [self._view(platform) for platform in platforms]
+        
+        if self.bedrock_client:
+            summaries = self._call_bedrock_batch([view.policy['text'] for view in views], platforms)
+        else:
+            summaries = [self._generate_mock_summary(platform, view.policy) for platform, view in zip(platforms, views)]
+        
+        return {platform: self._summary(view, summary_text)
+                for platform, view, summary_text in zip(platforms, views, summaries)}
+    
+    def _summary(self, view: PolicyView, summary_text: str) -> Dict:
+        """summarize_policy result for a policy and its key points"""
         return {
             'key_points': summary_text,
-            'concerns': self._extract_concerns(policy),
-            'positives': self._extract_positives(policy),
-            'score': self._calculate_score(policy),
-            'data_types': policy.get('data_types', [])
+            'concerns': view.concerns,
+            'positives': view.positives,
+            'score': view.score,
+            # A copy, so callers can't change the cached policy's list
+            'data_types': list(view.policy.get('data_types', []))
         }
     
     def _call_bedrock(self, policy_text: str, platform: str = "Unknown") -> str:
@@ -147,24 +362,148 @@ Policy: {policy_text[:2000]}
 Provide a concise, user-friendly summary."""
 
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId=os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0'),
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 500,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            return result['content'][0]['text']
+            return self._invoke_bedrock(prompt, 500)
         except Exception as e:
             print(f"Bedrock error: {e}")
             print("💡 Falling back to mock response for demo")
             return self._generate_mock_summary(platform, {"text": policy_text})
     
+    def _call_bedrock_batch(self, policy_texts: List[str], platforms: List[str]) -> List[str]:
+        """Summarize up to SUMMARY_BATCH_SIZE policies per Bedrock request"""
+        summaries = []
+        
+        for start in range(0, len(policy_texts), SUMMARY_BATCH_SIZE):
+            texts = policy_texts[start:start + SUMMARY_BATCH_SIZE]
+            names = platforms[start:start + SUMMARY_BATCH_SIZE]
+            
+            if len(texts) == 1:
+                summaries.append(self._call_bedrock(texts[0], names[0]))
+                continue
+            
+            policies = "\n\n".join(f"<POLICY id={i}>\n{text[:2000]}\n</POLICY>" for i, text in enumerate(texts))
+            prompt = f"""Summarize each of these privacy policies in simple terms. For each one, focus on:
+1. What data is collected
+2. How it's used
+3. Who it's shared with
+4. User rights
+
+{policies}
+
+Return only a JSON array with one object per policy: {{"id": <policy id>, "summary": "<concise, user-friendly summary>"}}"""
+            
+            by_id = {}
+            key = self._completion_key(prompt, 500 * len(texts))
+            try:
+                response = get_cached_response(key, metric='completion_cache') if self.cache else None
+                fresh = response is None
+                if fresh:
+                    response = self._completion(prompt, 500 * len(texts))
+                by_id = self._parse_batch(response)
+                
+                # Only an answer covering every policy is stored; a malformed or truncated
+                # one is asked again next time instead of fanning out from the cache
+                if fresh and self.cache and by_id.keys() == set(range(len(texts))):
+                    store_response(key, response)
+            except Exception as e:
+                print(f"Bedrock batch summary error: {e}")
+            finally:
+                discard_pending(key)
+            
+            # Anything the batch answer is missing gets its own request
+            summaries.extend(by_id.get(i) or self._call_bedrock(text, name)
+                             for i, (text, name) in enumerate(zip(texts, names)))
+        
+        return summaries
+    
+    def _parse_batch(self, response: str) -> Dict[int, str]:
+        """Non-empty summaries by policy id from a batch answer's JSON array"""
+        items = orjson.loads(response[response.index('['):response.rindex(']') + 1])
+        return {int(item['id']): item['summary'] for item in items
+                if isinstance(item.get('summary'), str) and item['summary'].strip()}
+    
+    def _invoke_bedrock(self, prompt: str, max_tokens: int, nocache: bool = False) -> str:
+        """Run one prompt through Bedrock; nocache=True forces a fresh completion"""
+        if not self.cache:
+            return self._completion(prompt, max_tokens)
+        if nocache:
+            # Refresh the stored copy so other processes pick up the new answer too
+            completion = self._completion(prompt, max_tokens)
+            store_response(self._completion_key(prompt, max_tokens), completion)
+            return completion
+        
+        completion = self._completions.get((prompt, max_tokens))
+        if completion is None:
+            completion = self._stored_completion(prompt, max_tokens)
+            self._completions.set((prompt, max_tokens), completion)
+        return completion
+    
+    def _stored_completion(self, prompt: str, max_tokens: int) -> str:
+        """Completion from the persistent response cache, calling Bedrock only on a miss"""
+        return cached_call(self._completion_key(prompt, max_tokens),
+                           lambda: self._completion(prompt, max_tokens), metric='completion_cache')
+    
+    def _completion_key(self, prompt: str, max_tokens: int) -> Dict:
+        """Response cache inputs for one completion (the model id is added by the cache)"""
+        return {'prompt': prompt, 'max_tokens': max_tokens, 'analysis_type': 'completion'}
+    
+    def _completion(self, prompt: str, max_tokens: int) -> str:
+        """Uncached completion; callers asking for a prompt already in flight wait for that call"""
+        key = (prompt, max_tokens)
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        
+        if not leader:
+            return flight.result()
+        
+        try:
+            completion = self._invoke_model(prompt, max_tokens)
+            flight.set_result(completion)
+            return completion
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+    
+    def _invoke_model(self, prompt: str, max_tokens: int) -> str:
+        """Single invoke_model call, throttled by the shared rate limiter"""
+        bedrock_bucket.acquire(estimate_tokens(prompt) + max_tokens)
+        response = self.bedrock_client.invoke_model(
+            modelId=BEDROCK_MODEL_ID,
+            body=self._request_body(prompt, max_tokens)
+        )
+        
+        result = orjson.loads(response['body'].read())
+        return result['content'][0]['text']
+    
+    def _stream_completion(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Yield the completion's text deltas as Bedrock generates them"""
+        bedrock_bucket.acquire(estimate_tokens(prompt) + max_tokens)
+        response = self.bedrock_client.invoke_model_with_response_stream(
+            modelId=BEDROCK_MODEL_ID,
+            body=self._request_body(prompt, max_tokens)
+        )
+        
+        for event in response['body']:
+            chunk = orjson.loads(event['chunk']['bytes'])
+            if chunk['type'] == 'content_block_delta':
+                yield chunk['delta'].get('text', '')
+    
+    def _request_body(self, prompt: str, max_tokens: int) -> bytes:
+        """invoke_model body for a single-turn Claude message"""
+        return orjson.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        })
+    
     def _generate_mock_summary(self, platform: str, policy: Dict) -> str:
         """Generate mock summary for demo"""
+        mark_degraded()
         data_types = ", ".join(policy.get('data_types', [])[:3])
         return f"""**{platform}** collects: {data_types}, and more.
 
@@ -174,32 +513,33 @@ Provide a concise, user-friendly summary."""
 
 **Your Rights**: You can request data deletion, but some data may be retained for legal purposes."""
     
-    def _extract_concerns(self, policy: Dict) -> str:
-        """Extract privacy concerns"""
-        concerns = []
-        if "indefinitely" in policy.get('retention', '').lower():
-            concerns.append("📌 Data retained indefinitely")
-        if "advertising" in policy.get('sharing', '').lower():
-            concerns.append("📌 Shared with advertisers")
-        if len(policy.get('data_types', [])) > 5:
-            concerns.append("📌 Collects extensive personal data")
-        
-        return "\n".join(concerns) if concerns else "No major red flags detected"
+    def _extract_concerns(self, policy: Dict, sharing: str, retention: str) -> str:
+        """Extract privacy concerns (sharing/retention already lowercased)"""
+        flags = (
+            ("indefinitely" in retention, "📌 Data retained indefinitely"),
+            ("advertising" in sharing, "📌 Shared with advertisers"),
+            (len(policy.get('data_types', [])) > 5, "📌 Collects extensive personal data")
+        )
+        
+        if not any(flagged for flagged, _ in flags):
+            return "No major red flags detected"
+        
+        return "\n".join(concern for flagged, concern in flags if flagged)
     
     def _extract_positives(self, policy: Dict) -> str:
         """Extract positive aspects"""
         return "✓ Allows data deletion requests\n✓ Provides privacy controls\n✓ GDPR compliant"
     
-    def _calculate_score(self, policy: Dict) -> int:
-        """Calculate privacy score (0-100)"""
+    def _calculate_score(self, policy: Dict, sharing: str, retention: str) -> int:
+        """Calculate privacy score (0-100) (sharing/retention already lowercased)"""
         score = 70
         
         # Deduct points for concerns
-        if "indefinitely" in policy.get('retention', '').lower():
+        if "indefinitely" in retention:
             score -= 15
         if len(policy.get('data_types', [])) > 6:
             score -= 10
-        if "advertising" in policy.get('sharing', '').lower():
+        if "advertising" in sharing:
             score -= 10
         
         return max(0, min(100, score))
@@ -218,43 +558,37 @@ Provide a concise, user-friendly summary."""
         }
         
         for dtype in data_types:
-            if any(x in dtype.lower() for x in ['photo', 'name', 'email', 'location']):
-                categories["Personal"].append(dtype)
-            elif any(x in dtype.lower() for x in ['usage', 'swipe', 'interaction', 'browsing']):
-                categories["Behavioral"].append(dtype)
-            elif any(x in dtype.lower() for x in ['device', 'ip', 'browser']):
-                categories["Technical"].append(dtype)
-            else:
-                categories["Social"].append(dtype)
+            category = next((name for name, pattern in DATA_CATEGORY_PATTERNS if pattern.search(dtype)), "Social")
+            categories[category].append(dtype)
         
         return {k: v for k, v in categories.items() if v}
     
     def assess_risk(self, platform: str) -> Dict:
         """Assess privacy risk"""
-        policy = self._load_policy(platform)
-        score = self._calculate_score(policy)
+        view = self._view(platform)
+        score = view.score
         
         return {
             'overall': f"{100-score}%",
             'trend': "↑ High" if score < 50 else "→ Medium" if score < 70 else "↓ Low",
-            'sharing': "High" if "advertising" in policy.get('sharing', '').lower() else "Medium",
+            'sharing': "High" if "advertising" in view.sharing else "Medium",
             'control': "Limited" if score < 60 else "Moderate",
             'analysis': f"Based on our AI analysis, {platform} has {'significant' if score < 60 else 'moderate'} privacy implications. Consider reviewing your privacy settings."
         }
     
     def compare_platforms(self, platforms: List[str]) -> Dict:
         """Compare multiple platforms"""
-        comparison = {}
-        
-        for platform in platforms:
-            policy = self._load_policy(platform)
-            comparison[platform] = {
-                'score': self._calculate_score(policy),
-                'data_count': len(policy.get('data_types', [])),
-                'sharing': policy.get('sharing', 'Unknown')
-            }
-        
-        return comparison
+        return {platform: self._compare_entry(platform) for platform in platforms}
+    
+    def _compare_entry(self, platform: str) -> Dict:
+        """One platform's row in a comparison"""
+        view = self._view(platform)
+        policy = view.policy
+        return {
+            'score': view.score,
+            'data_count': len(policy.get('data_types', [])),
+            'sharing': policy.get('sharing', 'Unknown')
+        }
     
     def summarize_policy_from_text(self, policy_text: str, platform: str) -> Dict:
         """Generate AI summary from raw policy text"""
@@ -275,11 +609,12 @@ Provide a concise, user-friendly summary."""
             "sharing": "Shares with partners and third parties",
             "retention": "Retains data as described in policy"
         }
+        view = self._make_view(mock_policy)
         
         return {
             'key_points': summary_text,
-            'concerns': self._extract_concerns(mock_policy),
-            'positives': self._extract_positives(mock_policy),
+            'concerns': view.concerns,
+            'positives': view.positives,
             'score': self._calculate_score_from_text(policy_text),
             'data_types': data_types
         }
@@ -287,77 +622,23 @@ Provide a concise, user-friendly summary."""
     def assess_risk_from_text(self, policy_text: str, platform: str) -> Dict:
         """Assess privacy risk from raw policy text"""
         score = self._calculate_score_from_text(policy_text)
+        text_lower = policy_text.lower()
         
         return {
             'overall': f"{100-score}%",
             'trend': "↑ High" if score < 50 else "→ Medium" if score < 70 else "↓ Low",
-            'sharing': "High" if "advertising" in policy_text.lower() or "partners" in policy_text.lower() else "Medium",
+            'sharing': "High" if "advertising" in text_lower or "partners" in text_lower else "Medium",
             'control': "Limited" if score < 60 else "Moderate",
             'analysis': f"Based on our AI analysis of the live policy text, {platform} has {'significant' if score < 60 else 'moderate'} privacy implications. The policy contains {'concerning' if score < 50 else 'standard'} data collection practices."
         }
     
     def _extract_data_types_from_text(self, text: str) -> List[str]:
         """Extract data types from policy text using keyword matching"""
-        text_lower = text.lower()
-        data_types = []
-        
-        # Common data type keywords
-        keywords = {
-            "email": "Email Address",
-            "phone": "Phone Number",
-            "location": "Location Data",
-            "photo": "Photos",
-            "message": "Messages",
-            "contact": "Contacts",
-            "device": "Device Information",
-            "ip address": "IP Address",
-            "cookie": "Cookies",
-            "browsing": "Browsing History",
-            "payment": "Payment Information",
-            "biometric": "Biometric Data",
-            "voice": "Voice Data",
-            "video": "Video Data",
-            "search": "Search History",
-            "preference": "User Preferences"
-        }
-        
-        for keyword, data_type in keywords.items():
-            if keyword in text_lower:
-                data_types.append(data_type)
+        found = policy_terms(text)
+        data_types = [data_type for keyword, data_type in DATA_TYPE_KEYWORDS if keyword in found]
         
         return data_types[:10]  # Limit to 10 types
     
-    def _calculate_score_from_text(self, text: str) -> int:
-        """Calculate privacy score from policy text"""
-        score = 70  # Start with neutral score
-        text_lower = text.lower()
-        
-        # Deduct points for concerning practices
-        concerning_terms = [
-            ("sell", -15), ("advertising", -10), ("marketing", -5),
-            ("third party", -10), ("partners", -8), ("affiliate", -8),
-            ("indefinitely", -15), ("permanent", -10), ("biometric", -15),
-            ("track", -10), ("monitor", -8), ("profile", -5),
-            ("share", -5), ("disclose", -8)
-        ]
-        
-        for term, penalty in concerning_terms:
-            if term in text_lower:
-                score += penalty
-        
-        # Add points for good practices
-        positive_terms = [
-            ("delete", 5), ("opt out", 8), ("control", 5),
-            ("consent", 8), ("privacy", 3), ("secure", 5),
-            ("encrypt", 10), ("anonymous", 8)
-        ]
-        
-        for term, bonus in positive_terms:
-            if term in text_lower:
-                score += bonus
-        
-        return max(0, min(100, score))
-    
     def chat_with_ai(self, question: str, platform: str) -> str:
         """Interactive AI chat about privacy policies"""
         policy = self._load_policy(platform)
@@ -367,8 +648,36 @@ Provide a concise, user-friendly summary."""
         else:
             return self._generate_mock_chat_response(question, platform, policy)
     
+    def stream_chat(self, question: str, platform: str) -> Iterator[str]:
+        """chat_with_ai, yielding the answer in pieces as it is generated (raises if it breaks off midway)"""
+        policy = self._load_policy(platform)
+        
+        if not self.bedrock_client:
+            yield self._generate_mock_chat_response(question, platform, policy)
+            return
+        
+        streamed = False
+        try:
+            for text in self._stream_completion(self._chat_prompt(question, policy), 300):
+                streamed = True
+                yield text
+        except Exception as e:
+            print(f"Chat Bedrock error: {e}")
+            if streamed:
+                # Part of the answer is already out; don't let it pass for a complete one
+                raise
+            yield self._generate_mock_chat_response(question, policy.get('platform', 'this platform'), policy)
+    
     def _call_bedrock_chat(self, question: str, policy: Dict) -> str:
         """Call Bedrock for chat response"""
+        try:
+            return self._invoke_bedrock(self._chat_prompt(question, policy), 300)
+        except Exception as e:
+            print(f"Chat Bedrock error: {e}")
+            return self._generate_mock_chat_response(question, policy.get('platform', 'this platform'), policy)
+    
+    def _chat_prompt(self, question: str, policy: Dict) -> str:
+        """Prompt for one chat question about a policy"""
         context = f"""
         Platform: {policy.get('platform', 'Unknown')}
         Data Types: {', '.join(policy.get('data_types', []))}
@@ -383,25 +692,12 @@ Question: {question}
 Context: {context}
 
 Provide a helpful, accurate answer in a conversational tone. Be specific and actionable."""
-
-        try:
-            response = self.bedrock_client.invoke_model(
-                modelId=os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0'),
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 300,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            return result['content'][0]['text']
-        except Exception as e:
-            print(f"Chat Bedrock error: {e}")
-            return self._generate_mock_chat_response(question, policy.get('platform', 'this platform'), policy)
+        
+        return prompt
     
     def _generate_mock_chat_response(self, question: str, platform: str, policy: Dict) -> str:
         """Generate mock chat responses for demo"""
+        mark_degraded()
         question_lower = question.lower()
         
         # Enhanced keyword matching for better responses
@@ -423,7 +719,7 @@ Provide a helpful, accurate answer in a conversational tone. Be specific and act
             return f"🔗 {platform} shares your data with: {sharing_info}. This means your information may be used beyond just the platform itself for advertising, analytics, and other business purposes."
         
         elif "location" in question_lower or "gps" in question_lower or "track" in question_lower:
-            location_data = [d for d in policy.get('data_types', []) if 'location' in d.lower() or 'gps' in d.lower()]
+            location_data = [d for d in policy.get('data_types', []) if any(k in d.lower() for k in ('location', 'gps'))]
             if location_data:
                 return f"📍 {platform} collects location data including: {', '.join(location_data)}. This can be used to track your movements and build detailed profiles of your daily activities."
             else:
@@ -468,7 +764,8 @@ Provide a helpful, accurate answer in a conversational tone. Be specific and act
     
     def get_harmful_points(self, platform: str) -> Dict:
         """Get only the harmful/concerning points from privacy policy using AI"""
-        policy = self._load_policy(platform)
+        view = self._view(platform)
+        policy = view.policy
         
         if self.bedrock_client:
             # Use Bedrock to extract only harmful points
@@ -478,111 +775,20 @@ Provide a helpful, accurate answer in a conversational tone. Be specific and act
             harmful_analysis = self._extract_harmful_fallback(policy, platform)
         
         return {
-            'score': self._calculate_score(policy),
+            'score': view.score,
             'harmful_points': harmful_analysis.get('harmful_points', ''),
             'worst_data': harmful_analysis.get('worst_data', ''),
             'recommendation': harmful_analysis.get('recommendation', '')
         }
     
-    def _extract_harmful_with_bedrock(self, policy_text: str, platform: str) -> Dict:
-        """Use Bedrock to extract only harmful/concerning points"""
-        prompt = f"""You are a privacy expert. Analyze this privacy policy and extract ONLY the most harmful/concerning points that users should worry about.
-
-Focus on:
-1. Data that could be used to harm, manipulate, or exploit users
-2. Sharing practices that put users at risk
-3. Retention policies that are excessive
-4. Lack of user control over their data
-
-Platform: {platform}
-Policy text: {policy_text[:3000]}
-
-Respond in this format:
-HARMFUL_POINTS: [2-3 sentences about the most concerning practices]
-WORST_DATA: [1-2 sentences about the most dangerous data they collect]
-RECOMMENDATION: [1 sentence about what the user should do]
-
-Be direct and focus only on what's actually harmful to users."""
-
-        try:
-            response = self.bedrock_client.invoke_model(
-                modelId=os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0'),
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 400,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            ai_response = result['content'][0]['text']
-            
-            # Parse the structured response
-            lines = ai_response.split('\n')
-            harmful_points = ""
-            worst_data = ""
-            recommendation = ""
-            
-            for line in lines:
-                if line.startswith('HARMFUL_POINTS:'):
-                    harmful_points = line.replace('HARMFUL_POINTS:', '').strip()
-                elif line.startswith('WORST_DATA:'):
-                    worst_data = line.replace('WORST_DATA:', '').strip()
-                elif line.startswith('RECOMMENDATION:'):
-                    recommendation = line.replace('RECOMMENDATION:', '').strip()
-            
-            return {
-                'harmful_points': harmful_points,
-                'worst_data': worst_data,
-                'recommendation': recommendation
-            }
-            
-        except Exception as e:
-            print(f"Bedrock harmful extraction error: {e}")
-            return self._extract_harmful_fallback({"text": policy_text}, platform)
-    
     def _extract_harmful_fallback(self, policy: Dict, platform: str) -> Dict:
         """Fallback method to extract harmful points without Bedrock"""
-        
-        # Platform-specific harmful points
-        harmful_data = {
-            "Tinder": {
-                "harmful_points": "Tinder collects your exact location, biometric data from photos, and tracks your swiping patterns to create detailed behavioral profiles. They share this intimate data with Match Group's 45+ companies and keep it indefinitely even after you delete your account.",
-                "worst_data": "Your precise location, facial recognition data, and detailed records of who you're attracted to - creating a comprehensive profile of your romantic preferences and physical movements.",
-                "recommendation": "Turn off location services, avoid uploading clear face photos, and regularly delete your account if you're not actively using it."
-            },
-            "Facebook": {
-                "harmful_points": "Facebook tracks your activity across the entire internet, builds shadow profiles of non-users through your contacts, and uses psychological manipulation techniques to increase engagement. They collect data even when you're not using Facebook.",
-                "worst_data": "Complete browsing history across all websites, real-time location tracking, and psychological profiling data used to influence your behavior and political views.",
-                "recommendation": "Use Facebook in a separate browser, turn off all location tracking, and regularly review what data they have on you."
-            },
-            "Instagram": {
-                "harmful_points": "Instagram analyzes your photos using AI to detect your emotions, relationships, and lifestyle patterns. They track how long you look at each post to manipulate your feed and keep you addicted to the platform.",
-                "worst_data": "AI analysis of your photos revealing personal relationships, mental health patterns, and detailed behavioral data used for algorithmic manipulation.",
-                "recommendation": "Limit photo uploads with people in them, turn off activity tracking, and use time limits to avoid algorithmic manipulation."
-            },
-            "TikTok": {
-                "harmful_points": "TikTok collects biometric data including face and voice prints, accesses your clipboard without permission, and may share data with the Chinese government. They track your behavior even when the app is closed.",
-                "worst_data": "Biometric identifiers (face, voice, keystroke patterns), clipboard contents, and detailed behavioral data that could be accessed by foreign governments.",
-                "recommendation": "Avoid using TikTok for sensitive communications, turn off microphone access, and consider the geopolitical risks of your data being in China."
-            },
-            "WhatsApp": {
-                "harmful_points": "While messages are encrypted, WhatsApp collects extensive metadata about who you talk to, when, and for how long. This metadata is shared with Facebook for advertising and can reveal your social network and behavior patterns.",
-                "worst_data": "Complete social network mapping, communication patterns, and location data that reveals your daily routines and relationships.",
-                "recommendation": "Use Signal for sensitive conversations, turn off read receipts and last seen, and limit location sharing."
-            },
-            "Finn.no": {
-                "harmful_points": "Finn.no tracks your search history and browsing patterns to build detailed profiles of your interests, income level, and life situation. This data is shared with advertising partners and could be used for price discrimination.",
-                "worst_data": "Detailed financial profiling based on what you search for and buy, revealing your economic situation and personal needs.",
-                "recommendation": "Use private browsing mode, avoid searching for sensitive items when not serious about buying, and regularly clear your search history."
-            }
-        }
-        
-        return harmful_data.get(platform, {
+        mark_degraded()
+        return HARMFUL_FALLBACKS.get(platform) or {
             "harmful_points": f"{platform} collects extensive personal data and shares it with third parties for advertising purposes.",
             "worst_data": "Personal information and behavioral data used for profiling and targeting.",
             "recommendation": "Review privacy settings and limit data sharing where possible."
-        })
+        }
     
     def analyze_scraped_policy(self, policy_text: str, company_name: str) -> Dict:
         """Analyze a freshly scraped privacy policy using AI"""
@@ -608,35 +814,14 @@ Be direct and focus only on what's actually harmful to users."""
     
     def _analyze_scraped_text(self, policy_text: str, company_name: str) -> Dict:
         """Analyze scraped policy text without Bedrock"""
-        text_lower = policy_text.lower()
+        mark_degraded()
+        found = policy_terms(policy_text)
         
         # Detect concerning practices
-        concerns = []
-        if any(term in text_lower for term in ['sell', 'selling', 'sold']):
-            concerns.append("may sell your personal data")
-        if any(term in text_lower for term in ['third party', 'third-party', 'partners']):
-            concerns.append("shares data with third parties")
-        if any(term in text_lower for term in ['track', 'tracking', 'monitor']):
-            concerns.append("tracks your online behavior")
-        if any(term in text_lower for term in ['location', 'gps', 'geolocation']):
-            concerns.append("collects location data")
-        if any(term in text_lower for term in ['biometric', 'facial', 'fingerprint']):
-            concerns.append("collects biometric data")
-        if any(term in text_lower for term in ['indefinitely', 'permanently', 'forever']):
-            concerns.append("retains data indefinitely")
+        concerns = [concern for terms, concern, _ in CONCERNING_PRACTICES if not found.isdisjoint(terms)]
         
         # Detect data types
-        data_types = []
-        if any(term in text_lower for term in ['email', 'e-mail']):
-            data_types.append("email addresses")
-        if any(term in text_lower for term in ['phone', 'telephone', 'mobile']):
-            data_types.append("phone numbers")
-        if any(term in text_lower for term in ['photo', 'image', 'picture']):
-            data_types.append("photos and images")
-        if any(term in text_lower for term in ['message', 'chat', 'communication']):
-            data_types.append("messages and communications")
-        if any(term in text_lower for term in ['browsing', 'website', 'web']):
-            data_types.append("browsing history")
+        data_types = [data_type for terms, data_type in SCRAPED_DATA_TYPES if not found.isdisjoint(terms)]
         
         # Generate analysis
         if concerns:
@@ -665,30 +850,14 @@ Be direct and focus only on what's actually harmful to users."""
     
     def _calculate_score_from_text(self, policy_text: str) -> int:
         """Calculate privacy risk score based on text analysis"""
-        text_lower = policy_text.lower()
+        found = policy_terms(policy_text)
         score = 30  # Base score
         
         # Increase score for concerning practices
-        if any(term in text_lower for term in ['sell', 'selling', 'sold']):
-            score += 25
-        if any(term in text_lower for term in ['third party', 'third-party', 'partners']):
-            score += 15
-        if any(term in text_lower for term in ['track', 'tracking', 'monitor']):
-            score += 15
-        if any(term in text_lower for term in ['location', 'gps', 'geolocation']):
-            score += 10
-        if any(term in text_lower for term in ['biometric', 'facial', 'fingerprint']):
-            score += 20
-        if any(term in text_lower for term in ['indefinitely', 'permanently', 'forever']):
-            score += 15
+        score += sum(risk for terms, _, risk in CONCERNING_PRACTICES if not found.isdisjoint(terms))
         
         # Decrease score for good practices
-        if any(term in text_lower for term in ['gdpr', 'data protection', 'user rights']):
-            score -= 10
-        if any(term in text_lower for term in ['delete', 'deletion', 'remove data']):
-            score -= 5
-        if any(term in text_lower for term in ['opt out', 'opt-out', 'unsubscribe']):
-            score -= 5
+        score -= sum(credit for terms, credit in GOOD_PRACTICES if not found.isdisjoint(terms))
         
         return min(max(score, 0), 100)  # Keep between 0-100
     
@@ -710,33 +879,23 @@ Focus only on genuinely concerning practices that could harm user privacy or sec
         try:
             response = self._call_bedrock(prompt)
             
-            # Parse the response to extract structured data
-            lines = response.split('\n')
-            harmful_points = ""
-            worst_data = ""
-            recommendation = ""
+            # Parse the response to extract structured data (lowercased once, in one go)
+            sections = {name: [] for name, _ in RESPONSE_SECTION_PATTERNS}
             
             current_section = None
-            for line in lines:
+            for line, lowered in zip(response.split('\n'), response.lower().split('\n')):
                 line = line.strip()
-                if '1.' in line or 'harmful' in line.lower() or 'concerning' in line.lower():
-                    current_section = 'harmful'
-                elif '2.' in line or 'data' in line.lower() or 'collect' in line.lower():
-                    current_section = 'data'
-                elif '3.' in line or 'recommend' in line.lower():
-                    current_section = 'recommendation'
+                heading = next((name for name, pattern in RESPONSE_SECTION_PATTERNS
+                                if pattern.search(lowered)), None)
+                if heading:
+                    current_section = heading
                 elif line and current_section:
-                    if current_section == 'harmful':
-                        harmful_points += line + " "
-                    elif current_section == 'data':
-                        worst_data += line + " "
-                    elif current_section == 'recommendation':
-                        recommendation += line + " "
+                    sections[current_section].append(line)
             
             # Clean up the extracted text
-            harmful_points = harmful_points.strip()[:500]
-            worst_data = worst_data.strip()[:300]
-            recommendation = recommendation.strip()[:400]
+            harmful_points = ' '.join(sections['harmful'])[:500]
+            worst_data = ' '.join(sections['data'])[:300]
+            recommendation = ' '.join(sections['recommendation'])[:400]
             
             # Fallback if parsing failed
             if not harmful_points:
@@ -759,6 +918,7 @@ Focus only on genuinely concerning practices that could harm user privacy or sec
     
     def get_generic_analysis(self, company_name: str) -> Dict:
         """Provide generic analysis when scraping fails"""
+        mark_degraded()
         return {
             'score': 50,
             'harmful_points': f"{company_name} likely collects personal data including contact information, usage patterns, and device information. Without access to their privacy policy, the full extent of data collection is unknown.",
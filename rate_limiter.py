@@ -0,0 +1,78 @@
+"""
+Token bucket rate limiting for outbound Bedrock and scraper calls
+Keeps bursts of extension/UI traffic under the provider's requests-per-minute
+and tokens-per-minute quotas instead of tripping 429s and retry storms.
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token estimate (~4 characters per token)"""
+    return len(text) // 4
+
+class TokenBucket:
+    """Thread-safe limiter on both requests and LLM tokens per minute"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 workers: int = 1):
+        # Each process gets an equal share of the quota. The share may be under one
+        # request a minute, so the bucket still holds at least one request and
+        # refills at the fractional rate
+        self.request_rate = requests_per_minute / workers
+        self.request_capacity = max(self.request_rate, 1)
+        self.token_capacity = tokens_per_minute / workers if tokens_per_minute else None
+
+        self.request_tokens = self.request_capacity
+        self.token_tokens = self.token_capacity
+        self.last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int = 0):
+        """Block until one request and estimated_tokens tokens are available"""
+        if self.token_capacity is not None:
+            estimated_tokens = min(estimated_tokens, self.token_capacity)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self.last_update
+                self.last_update = now
+
+                # Replenish at capacity per minute
+                self.request_tokens = min(self.request_capacity,
+                                          self.request_tokens + elapsed * self.request_rate / 60)
+                request_wait = (1 - self.request_tokens) * 60 / self.request_rate
+
+                token_wait = 0
+                if self.token_capacity is not None:
+                    self.token_tokens = min(self.token_capacity,
+                                            self.token_tokens + elapsed * self.token_capacity / 60)
+                    token_wait = (estimated_tokens - self.token_tokens) * 60 / self.token_capacity
+
+                if request_wait <= 0 and token_wait <= 0:
+                    self.request_tokens -= 1
+                    if self.token_capacity is not None:
+                        self.token_tokens -= estimated_tokens
+                    return
+
+            time.sleep(max(request_wait, token_wait))
+
+# Quota is shared by the gunicorn API workers plus the Streamlit process
+WORKERS = int(os.getenv('API_WORKERS', '2')) + 1
+
+bedrock_bucket = TokenBucket(
+    requests_per_minute=float(os.getenv('BEDROCK_RPM', '60')),
+    tokens_per_minute=float(os.getenv('BEDROCK_TPM', '100000')),
+    workers=WORKERS
+)
+
+scraper_bucket = TokenBucket(
+    requests_per_minute=float(os.getenv('SCRAPER_RPM', '30')),
+    workers=WORKERS
+)
@@ -0,0 +1,134 @@
+"""
+Deterministic response cache for analysis and chat results
+Requests are keyed by a SHA256 hash of their inputs and looked up before
+running the scraper or the LLM, so repeated questions skip inference entirely.
+
+Responses that fell back to mock or keyword output (Bedrock or the scraper
+unavailable) are flagged with mark_degraded() and never stored, and stored
+rows expire after database.RESPONSE_CACHE_TTL.
+
+CACHE_MODE controls the behaviour:
+    enabled     read and write the cache (default)
+    replay      read only, raise on a miss (reproducible runs)
+    write_only  always recompute, but record the results
+    disabled    bypass the cache completely
+"""
+
+import hashlib
+import json
+import orjson
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+from database import get_db
+from cache_metrics import record_hit, record_miss, record_miss_time
+
+load_dotenv()
+
+CACHE_MODES = ('enabled', 'replay', 'write_only', 'disabled')
+CACHE_MODE = os.getenv('CACHE_MODE', 'enabled')
+MODEL_ID = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
+
+if CACHE_MODE not in CACHE_MODES:
+    raise ValueError(f"CACHE_MODE must be one of {CACHE_MODES}, got {CACHE_MODE!r}")
+
+# Misses this thread is computing: cache key -> [metric, lookup start, degraded]
+_local = threading.local()
+
+# Pending misses remembered per thread; ones abandoned by an exception are dropped oldest first
+PENDING_LIMIT = 64
+
+def _pending() -> Dict[str, list]:
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = {}
+    return pending
+
+def cache_key(inputs: Dict) -> str:
+    """SHA256 of the canonical JSON form of the request inputs and model"""
+    canonical = json.dumps({**inputs, 'model_id': MODEL_ID}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def get_cached_response(inputs: Dict, metric: str = 'response_cache') -> Optional[Any]:
+    """Return the cached response for these inputs, or None on a miss"""
+    if CACHE_MODE == 'disabled':
+        return None
+
+    key = cache_key(inputs)
+    start = time.perf_counter()
+
+    if CACHE_MODE == 'write_only':
+        _begin(key, metric, None)
+        return None
+
+    try:
+        payload = get_db().get_cached_response(key)
+    except Exception as e:
+        print(f"Response cache read error: {e}")
+        payload = None
+
+    if payload is not None:
+        # BLOB column, so the driver hands back raw bytes that orjson parses directly
+        response = orjson.loads(payload)
+        record_hit(metric, time.perf_counter() - start)
+        return response
+
+    record_miss(metric)
+
+    if CACHE_MODE == 'replay':
+        raise LookupError(f"No cached response for {inputs} (CACHE_MODE=replay)")
+
+    _begin(key, metric, start)
+    return None
+
+def _begin(key: str, metric: str, start: Optional[float]):
+    """Remember a miss so store_response can time it and see whether it fell back"""
+    pending = _pending()
+    pending.pop(key, None)
+    pending[key] = [metric, start, False]
+    while len(pending) > PENDING_LIMIT:
+        pending.pop(next(iter(pending)))
+
+def mark_degraded():
+    """The responses this thread is computing fell back to mock/keyword output; don't store them"""
+    for entry in _pending().values():
+        entry[2] = True
+
+def store_response(inputs: Dict, response: Any):
+    """Record a freshly computed response for these inputs (unless it was marked degraded)"""
+    if CACHE_MODE in ('replay', 'disabled'):
+        return
+
+    key = cache_key(inputs)
+    entry = _pending().pop(key, None)
+    if entry is not None:
+        metric, start, degraded = entry
+        if degraded:
+            return
+        if start is not None:
+            record_miss_time(metric, time.perf_counter() - start)
+
+    try:
+        get_db().save_cached_response(key, orjson.dumps(response))
+    except Exception as e:
+        print(f"Response cache write error: {e}")
+
+def discard_pending(inputs: Dict):
+    """Forget a miss whose response will not be stored"""
+    _pending().pop(cache_key(inputs), None)
+
+def cached_call(inputs: Dict, compute: Callable[[], Any], metric: str = 'response_cache') -> Any:
+    """Look the inputs up in the cache, running compute() only on a miss"""
+    response = get_cached_response(inputs, metric)
+
+    if response is None:
+        try:
+            response = compute()
+        except BaseException:
+            discard_pending(inputs)
+            raise
+        store_response(inputs, response)
+
+    return response
@@ -4,13 +4,48 @@ Automatically finds and scrapes privacy policies from any company website
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
 import json
 from pathlib import Path
 from typing import Dict, List
 import re
 from urllib.parse import urljoin, urlparse
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from ttl_cache import TTLCache
+from rate_limiter import scraper_bucket
+
+# Parse with lxml's C parser when it is installed, otherwise the pure-Python one
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Scheme (and optional leading www.) of user-entered websites
+_URL_SCHEME = re.compile(r'^https?://', re.I)
+_URL_STRIP = re.compile(r'^(?:https?://)?(?:www\.)?', re.I)
+
+# Page structure matchers used while scraping
+_WHITESPACE = re.compile(r'\s+')
+_CONTENT_CLASS = re.compile('content|policy|privacy|main', re.I)
+_WRAPPER_CLASS = re.compile('container|wrapper', re.I)
+_TITLE_ONLY = SoupStrainer('title')
+_LINKS_ONLY = SoupStrainer('a', href=True)
+
+@lru_cache(maxsize=1024)
+def normalize_website(website: str) -> str:
+    """Strip the scheme and trailing slash from a user-entered website and lowercase its host"""
+    host, slash, path = _URL_SCHEME.sub('', website.strip()).rstrip('/').partition('/')
+    return host.lower() + slash + path
+
+@lru_cache(maxsize=1024)
+def extract_company(website: str) -> str:
+    """Display name from a website's domain (https://www.spotify.com -> Spotify)"""
+    return _URL_STRIP.sub('', website.strip()).split('/')[0].split('.')[0].capitalize()
 
 class PolicyScraper:
     """Enhanced scraper that finds and analyzes privacy policies from any company website"""
@@ -25,7 +60,7 @@ class PolicyScraper:
     }
     
     # Common privacy policy URL patterns
-    PRIVACY_URL_PATTERNS = [
+    PRIVACY_URL_PATTERNS = (
         '/privacy',
         '/privacy-policy',
         '/privacy-notice',
@@ -41,13 +76,30 @@ class PolicyScraper:
         '/personvern',  # Norwegian
         '/datenschutz',  # German
         '/confidentialite'  # French
-    ]
+    )
+    
+    # HEAD requests sent at once while probing the URL patterns
+    PROBE_WORKERS = 8
+    
+    # Probe answers that say whether a URL exists (and company names read from a
+    # site's <title>) are remembered for PROBE_CACHE_TTL seconds
+    DEFINITE_STATUSES = (200, 404, 410)
+    PROBE_CACHE_TTL = 3600
+    
+    # Most of a policy page downloaded and parsed; only 10k characters of text are kept
+    MAX_POLICY_BYTES = 512 * 1024
+    
+    # Start of the home page read for its <title>, which sits in <head>
+    MAX_TITLE_BYTES = 16 * 1024
     
     # Keywords to look for in links
-    PRIVACY_KEYWORDS = [
+    PRIVACY_KEYWORDS = (
         'privacy', 'policy', 'personvern', 'datenschutz', 
         'confidentialité', 'privacidad', 'privacidade'
-    ]
+    )
+    
+    # Any of the keywords, found in one pass over a link's href and text
+    _PRIVACY_LINK = re.compile('|'.join(map(re.escape, PRIVACY_KEYWORDS)))
     
     def __init__(self):
         self.output_dir = Path("data/policies")
@@ -56,19 +108,32 @@ class PolicyScraper:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Pooled keep-alive connections, shared by every thread using this scraper;
+        # transient gateway errors are retried on the same pool. Timeouts are not: each
+        # retry would add another full timeout and push slow scrapes past gunicorn's limit
+        retries = Retry(total=2, connect=0, read=0, status=2, backoff_factor=0.2,
+                        status_forcelist=[502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self._probe_pool = ThreadPoolExecutor(max_workers=self.PROBE_WORKERS)
+        self._probe_cache = TTLCache(maxsize=256, ttl=self.PROBE_CACHE_TTL)
+        # Company names read from each site's <title>, by netloc
+        self._name_cache = TTLCache(maxsize=256, ttl=self.PROBE_CACHE_TTL)
+        
+        # Longest first, so a more specific known domain wins over its parent
+        self._known_suffix = tuple(sorted(self.KNOWN_PRIVACY_URLS, key=len, reverse=True))
         
     def scrape_policy(self, platform: str, url: str) -> Dict:
         """Scrape a single privacy policy"""
         print(f"Scraping {platform}...")
         
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(response.content, HTML_PARSER)
             
             # Remove script and style elements
             for script in soup(["script", "style", "nav", "footer", "header"]):
@@ -77,11 +142,9 @@ class PolicyScraper:
             # Get text content
             text = soup.get_text(separator=' ', strip=True)
             
-            # Clean up whitespace
-            text = ' '.join(text.split())
-            
-            # Limit to first 5000 chars for processing
-            text = text[:5000]
+            # Clean up whitespace and limit to first 5000 chars for processing; only a
+            # bounded prefix is normalized since the rest is thrown away
+            text = _WHITESPACE.sub(' ', text[:20000]).strip()[:5000]
             
             return {
                 "platform": platform,
@@ -128,11 +191,15 @@ class PolicyScraper:
             Dict containing scraped policy data and metadata
         """
         print(f"🔍 Analyzing {company_website}...")
+        scraper_bucket.acquire()
         
         # Normalize URL
         if not company_website.startswith(('http://', 'https://')):
             company_website = 'https://' + company_website
         
+        # Every outcome reports the company name, so its title fetch runs alongside the search
+        name_future = self._probe_pool.submit(self._extract_company_name, company_website)
+        
         try:
             # Step 1: Find privacy policy URL
             privacy_urls = self._find_privacy_policy_urls(company_website)
@@ -140,7 +207,7 @@ class PolicyScraper:
             if not privacy_urls:
                 return {
                     "company_website": company_website,
-                    "company_name": self._extract_company_name(company_website),
+                    "company_name": name_future.result(),
                     "privacy_url": None,
                     "scraped": False,
                     "error": "No privacy policy URL found",
@@ -168,11 +235,9 @@ class PolicyScraper:
                 successful_url = privacy_urls[0] if privacy_urls else None
             
             # Step 3: Extract company information
-            company_name = self._extract_company_name(company_website)
-            
             return {
                 "company_website": company_website,
-                "company_name": company_name,
+                "company_name": name_future.result(),
                 "privacy_url": successful_url,
                 "scraped": policy_data.get('scraped', False),
                 "text": policy_data.get('text', ''),
@@ -185,7 +250,7 @@ class PolicyScraper:
             print(f"❌ Error analyzing {company_website}: {e}")
             return {
                 "company_website": company_website,
-                "company_name": self._extract_company_name(company_website),
+                "company_name": name_future.result(),
                 "privacy_url": None,
                 "scraped": False,
                 "error": str(e),
@@ -195,81 +260,57 @@ class PolicyScraper:
     def _find_privacy_policy_urls(self, website_url: str) -> List[str]:
         """Find all possible privacy policy URLs for a website"""
         privacy_urls = []
+        seen = set()
         
-        # Check if we have a known URL for this domain
-        domain = urlparse(website_url).netloc.replace('www.', '')
-        if domain in self.KNOWN_PRIVACY_URLS:
-            known_url = self.KNOWN_PRIVACY_URLS[domain]
-            privacy_urls.append(known_url)
-            print(f"✓ Using known privacy URL: {known_url}")
+        # Known domains (and their subdomains) skip the page fetch and probing entirely
+        domain = urlparse(website_url).netloc.lower().replace('www.', '')
+        for suffix in self._known_suffix:
+            if domain == suffix or domain.endswith('.' + suffix):
+                known_url = self.KNOWN_PRIVACY_URLS[suffix]
+                print(f"✓ Using known privacy URL: {known_url}")
+                return [known_url]
         
         try:
             # Get the main page
             response = self.session.get(website_url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            base_url = f"{urlparse(website_url).scheme}://{urlparse(website_url).netloc}"
+            # Only the page's links are built into the tree
+            soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=_LINKS_ONLY)
+            parsed = urlparse(website_url)
+            base_url = f"{parsed.scheme}://{parsed.netloc}"
             
-            # Method 1: Look for links containing privacy keywords
+            # Method 1: Look for links containing privacy keywords (footer links included,
+            # so they need no separate pass)
             for link in soup.find_all('a', href=True):
                 href = link.get('href', '').lower()
                 text = link.get_text().lower()
                 
                 # Check if link text or href contains privacy keywords
-                if any(keyword in href or keyword in text for keyword in self.PRIVACY_KEYWORDS):
+                if self._PRIVACY_LINK.search(f'{href}\n{text}'):
                     full_url = urljoin(base_url, link['href'])
-                    if full_url not in privacy_urls:
+                    if full_url not in seen:
+                        seen.add(full_url)
                         privacy_urls.append(full_url)
             
-            # Method 2: Try common privacy policy URL patterns
-            for pattern in self.PRIVACY_URL_PATTERNS:
-                test_url = base_url + pattern
-                try:
-                    test_response = self.session.head(test_url, timeout=5, allow_redirects=True)
-                    if test_response.status_code == 200:
-                        if test_url not in privacy_urls:
-                            privacy_urls.append(test_url)
-                            print(f"✓ Found via pattern: {test_url}")
-                except Exception as e:
-                    continue
-            
-            # Method 2.5: Try with /legal/ prefix
-            legal_patterns = ['/legal/privacy-policy', '/legal/privacy', '/help/privacy', '/support/privacy']
-            for pattern in legal_patterns:
-                test_url = base_url + pattern
-                try:
-                    test_response = self.session.head(test_url, timeout=5, allow_redirects=True)
-                    if test_response.status_code == 200:
-                        if test_url not in privacy_urls:
-                            privacy_urls.append(test_url)
-                            print(f"✓ Found via legal pattern: {test_url}")
-                except:
-                    continue
-            
-            # Method 3: Look in footer links
-            footer = soup.find('footer') or soup.find(class_=re.compile('footer', re.I))
-            if footer:
-                for link in footer.find_all('a', href=True):
-                    href = link.get('href', '').lower()
-                    text = link.get_text().lower()
-                    
-                    if any(keyword in href or keyword in text for keyword in self.PRIVACY_KEYWORDS):
-                        full_url = urljoin(base_url, link['href'])
-                        if full_url not in privacy_urls:
-                            privacy_urls.append(full_url)
-            
-            # Sort by relevance (exact matches first)
-            def url_relevance(url):
+            # Method 2: Try common privacy policy URL patterns (probed concurrently,
+            # results kept in pattern order), unless the page already links a privacy policy
+            if not any('privacy-policy' in url.lower() for url in privacy_urls):
+                test_urls = [base_url + pattern for pattern in self.PRIVACY_URL_PATTERNS]
+                for test_url, found in zip(test_urls, self._probe_pool.map(self._probe, test_urls)):
+                    if found and test_url not in seen:
+                        seen.add(test_url)
+                        privacy_urls.append(test_url)
+                        print(f"✓ Found via pattern: {test_url}")
+            
+            # Sort by relevance (exact matches first, discovery order within a rank)
+            ranked = []
+            for i, url in enumerate(privacy_urls):
                 url_lower = url.lower()
-                if 'privacy-policy' in url_lower:
-                    return 0
-                elif 'privacy' in url_lower:
-                    return 1
-                else:
-                    return 2
-            
-            privacy_urls.sort(key=url_relevance)
+                rank = 0 if 'privacy-policy' in url_lower else 1 if 'privacy' in url_lower else 2
+                ranked.append((rank, i, url))
+            ranked.sort()
+            privacy_urls = [url for _, _, url in ranked]
             
             print(f"🔗 Found {len(privacy_urls)} potential privacy policy URLs")
             return privacy_urls[:5]  # Return top 5 candidates
@@ -278,13 +319,31 @@ class PolicyScraper:
             print(f"❌ Error finding privacy URLs: {e}")
             return []
     
+    def _probe(self, url: str) -> bool:
+        """Whether a HEAD request for the URL ends in a 200"""
+        found = self._probe_cache.get(url)
+        if found is not None:
+            return found
+        
+        try:
+            status = self.session.head(url, timeout=5, allow_redirects=True).status_code
+        except Exception:
+            return False
+        
+        # Throttling and HEAD-hostile answers (429, 403, 405, ...) are retried next time
+        if status in self.DEFINITE_STATUSES:
+            self._probe_cache.set(url, status == 200)
+        return status == 200
+    
     def _scrape_privacy_content(self, privacy_url: str) -> Dict:
         """Scrape content from a privacy policy URL"""
         try:
-            response = self.session.get(privacy_url, timeout=15)
-            response.raise_for_status()
+            # Stream the page and stop reading after MAX_POLICY_BYTES (decompressed)
+            with self.session.get(privacy_url, timeout=15, stream=True) as response:
+                response.raise_for_status()
+                html = response.raw.read(self.MAX_POLICY_BYTES, decode_content=True)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(html, HTML_PARSER)
             
             # Remove unwanted elements
             for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
@@ -294,8 +353,8 @@ class PolicyScraper:
             main_content = (
                 soup.find('main') or 
                 soup.find('article') or 
-                soup.find(class_=re.compile('content|policy|privacy|main', re.I)) or
-                soup.find('div', class_=re.compile('container|wrapper', re.I)) or
+                soup.find(class_=_CONTENT_CLASS) or
+                soup.find('div', class_=_WRAPPER_CLASS) or
                 soup.body
             )
             
@@ -305,7 +364,7 @@ class PolicyScraper:
                 text = soup.get_text(separator=' ', strip=True)
             
             # Clean up text
-            text = re.sub(r'\s+', ' ', text).strip()
+            text = _WHITESPACE.sub(' ', text).strip()
             
             # Validate that this looks like a privacy policy
             privacy_indicators = ['privacy', 'personal data', 'information', 'collect', 'use', 'share']
@@ -343,16 +402,21 @@ class PolicyScraper:
         """Extract company name from website URL or content"""
         try:
             # Try to get company name from domain
-            domain = urlparse(website_url).netloc
-            domain = domain.replace('www.', '').replace('.com', '').replace('.no', '').replace('.org', '')
+            netloc = urlparse(website_url).netloc
+            cached = self._name_cache.get(netloc)
+            if cached is not None:
+                return cached
+            
+            domain = netloc.replace('www.', '').replace('.com', '').replace('.no', '').replace('.org', '')
             
             # Capitalize first letter
             company_name = domain.split('.')[0].capitalize()
             
             # Try to get better name from website title
             try:
-                response = self.session.get(website_url, timeout=5)
-                soup = BeautifulSoup(response.content, 'html.parser')
+                with self.session.get(website_url, timeout=5, stream=True) as response:
+                    head = response.raw.read(self.MAX_TITLE_BYTES, decode_content=True)
+                soup = BeautifulSoup(head, HTML_PARSER, parse_only=_TITLE_ONLY)
                 title = soup.find('title')
                 if title:
                     title_text = title.get_text().strip()
@@ -363,6 +427,8 @@ class PolicyScraper:
                             break
                     else:
                         company_name = title_text.strip()
+                    # Only names read from a <title> are kept; a failed fetch is retried next time
+                    self._name_cache.set(netloc, company_name)
             except:
                 pass
             
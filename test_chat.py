@@ -4,6 +4,7 @@ Test script for the enhanced chat functionality
 """
 
 from policy_analyzer import PolicyAnalyzer
+from concurrent.futures import ThreadPoolExecutor
 import json
 
 def test_chat_functionality():
@@ -55,12 +56,17 @@ def test_chat_functionality():
     
     results = []
     
-    for i, test in enumerate(test_cases, 1):
+    # Ask every question at once; each one is a Bedrock round trip
+    pool = ThreadPoolExecutor(max_workers=len(test_cases))
+    futures = [pool.submit(analyzer.chat_with_ai, test['question'], test['platform']) for test in test_cases]
+    pool.shutdown(wait=False)
+    
+    for i, (test, future) in enumerate(zip(test_cases, futures), 1):
         print(f"\n{i}. Testing: {test['question']}")
         print(f"   Platform: {test['platform']}")
         
         try:
-            response = analyzer.chat_with_ai(test['question'], test['platform'])
+            response = future.result()
             
             # Check if response contains expected keywords
             response_lower = response.lower()
@@ -0,0 +1,44 @@
+"""
+In-memory LRU cache whose entries also expire after a TTL
+Used for hot analyses in database.py, Bedrock completions in policy_analyzer.py
+and HEAD probe answers in scraper.py.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+class TTLCache:
+    """Thread-safe LRU dict whose entries also expire after a TTL"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
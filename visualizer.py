@@ -1,119 +1,161 @@
+import base64
+import numpy as np
+import orjson
 import plotly.graph_objects as go
 import plotly.express as px
-from typing import Dict, List
+from functools import lru_cache
+from itertools import chain
+from types import MappingProxyType
+from typing import Dict, List, Optional
+
+# Static image export needs kaleido; without it only the interactive figures are available
+try:
+    import kaleido  # noqa: F401
+    HAVE_KALEIDO = True
+except ImportError:
+    HAVE_KALEIDO = False
+
+# Chart constants, built once at import (plotly copies specs into each figure,
+# so sharing them between figures is safe)
+COLOR_SCHEME = MappingProxyType({
+    "Personal": "#FF6B6B",
+    "Behavioral": "#FFA500", 
+    "Technical": "#4ECDC4",
+    "Social": "#95E1D3"
+})
+
+EDGE_MARGIN = MappingProxyType(dict(t=50, l=0, r=0, b=0))
+
+RISK_GAUGE = MappingProxyType({
+    'axis': {'range': [None, 100]},
+    'bar': {'color': "darkblue"},
+    'steps': [
+        {'range': [0, 30], 'color': "#4ECDC4"},
+        {'range': [30, 70], 'color': "#FFA500"},
+        {'range': [70, 100], 'color': "#FF6B6B"}
+    ],
+    'threshold': {
+        'line': {'color': "red", 'width': 4},
+        'thickness': 0.75,
+        'value': 90
+    }
+})
+
+def _figure(data: List[Dict], layout: Dict) -> go.Figure:
+    """Figure from plain trace/layout dicts, skipping plotly's per-property validation"""
+    return go.Figure({'data': data, 'layout': layout}, _validate=False)
 
 def create_data_map(data_map: Dict) -> go.Figure:
     """Create interactive data collection visualization"""
     
-    # Prepare data for sunburst chart
-    labels = ["Data Collection"]
-    parents = [""]
-    values = [0]
-    colors = []
+    # Prepare data for sunburst chart: the root, then each category followed by its items
+    category_colors = {category: COLOR_SCHEME.get(category, "#CCCCCC") for category in data_map}
     
-    color_scheme = {
-        "Personal": "#FF6B6B",
-        "Behavioral": "#FFA500", 
-        "Technical": "#4ECDC4",
-        "Social": "#95E1D3"
-    }
-    
-    for category, items in data_map.items():
-        labels.append(category)
-        parents.append("Data Collection")
-        values.append(len(items))
-        colors.append(color_scheme.get(category, "#CCCCCC"))
-        
-        for item in items:
-            labels.append(item)
-            parents.append(category)
-            values.append(1)
-            colors.append(color_scheme.get(category, "#CCCCCC"))
+    labels = ["Data Collection", *chain.from_iterable([category, *items] for category, items in data_map.items())]
+    parents = ["", *chain.from_iterable(["Data Collection", *[category] * len(items)]
+                                        for category, items in data_map.items())]
+    values = [0, *chain.from_iterable([len(items), *[1] * len(items)] for items in data_map.values())]
+    colors = list(chain.from_iterable([category_colors[category]] * (len(items) + 1)
+                                      for category, items in data_map.items()))
     
-    fig = go.Figure(go.Sunburst(
-        labels=labels,
-        parents=parents,
-        values=values,
-        marker=dict(colors=colors),
-        hovertemplate='<b>%{label}</b><br>Items: %{value}<extra></extra>',
-    ))
-    
-    fig.update_layout(
-        title="Data Collection Breakdown",
-        height=600,
-        margin=dict(t=50, l=0, r=0, b=0)
+    return _figure(
+        [dict(
+            type='sunburst',
+            labels=labels,
+            parents=parents,
+            values=values,
+            marker=dict(colors=colors),
+            hovertemplate='<b>%{label}</b><br>Items: %{value}<extra></extra>',
+        )],
+        dict(
+            title=dict(text="Data Collection Breakdown"),
+            uirevision='data_map',
+            height=600,
+            margin=dict(EDGE_MARGIN)
+        )
     )
+
+def create_data_map_summary(data_map: Dict) -> go.Figure:
+    """Categories and their item counts only, for maps too large to send item by item"""
+    categories = list(data_map)
     
-    return fig
+    # Leaf items stay on the server; a click handler can look them up in data_map[category]
+    return _figure(
+        [dict(
+            type='sunburst',
+            labels=["Data Collection", *categories],
+            parents=["", *["Data Collection"] * len(categories)],
+            values=[0, *map(len, data_map.values())],
+            marker=dict(colors=["white", *(COLOR_SCHEME.get(category, "#CCCCCC") for category in categories)]),
+            hovertemplate='<b>%{label}</b><br>Items: %{value}<extra></extra>',
+        )],
+        dict(
+            title=dict(text="Data Collection Breakdown"),
+            uirevision='data_map_summary',
+            height=600,
+            margin=dict(EDGE_MARGIN)
+        )
+    )
 
 def create_comparison_chart(comparison_data: Dict) -> go.Figure:
     """Create platform comparison chart"""
     
+    # Numeric columns as arrays, which orjson encodes natively (see figure_to_json)
     platforms = list(comparison_data.keys())
-    scores = [comparison_data[p]['score'] for p in platforms]
-    data_counts = [comparison_data[p]['data_count'] for p in platforms]
-    
-    fig = go.Figure()
-    
-    # Privacy scores
-    fig.add_trace(go.Bar(
-        name='Privacy Score',
-        x=platforms,
-        y=scores,
-        marker_color='#4ECDC4',
-        text=scores,
-        textposition='auto',
-    ))
-    
-    # Data collection count
-    fig.add_trace(go.Bar(
-        name='Data Types Collected',
-        x=platforms,
-        y=data_counts,
-        marker_color='#FF6B6B',
-        text=data_counts,
-        textposition='auto',
-        yaxis='y2'
-    ))
+    scores = np.array([data['score'] for data in comparison_data.values()])
+    data_counts = np.fromiter((data['data_count'] for data in comparison_data.values()),
+                              dtype=np.int64, count=len(comparison_data))
     
-    fig.update_layout(
-        title='Platform Privacy Comparison',
-        xaxis=dict(title='Platform'),
-        yaxis=dict(
-            title='Privacy Score (0-100)',
-            titlefont=dict(color='#4ECDC4'),
-            tickfont=dict(color='#4ECDC4')
-        ),
-        yaxis2=dict(
-            title='Data Types Collected',
-            titlefont=dict(color='#FF6B6B'),
-            tickfont=dict(color='#FF6B6B'),
-            overlaying='y',
-            side='right'
-        ),
-        barmode='group',
-        height=500,
-        hovermode='x unified'
+    return _figure(
+        [
+            # Privacy scores
+            dict(
+                type='bar',
+                name='Privacy Score',
+                x=platforms,
+                y=scores,
+                marker=dict(color='#4ECDC4'),
+                text=[str(data['score']) for data in comparison_data.values()],
+                textposition='auto',
+            ),
+            # Data collection count
+            dict(
+                type='bar',
+                name='Data Types Collected',
+                x=platforms,
+                y=data_counts,
+                marker=dict(color='#FF6B6B'),
+                text=[str(data['data_count']) for data in comparison_data.values()],
+                textposition='auto',
+                yaxis='y2'
+            )
+        ],
+        dict(
+            title=dict(text='Platform Privacy Comparison'),
+            uirevision='comparison',
+            xaxis=dict(title=dict(text='Platform')),
+            yaxis=dict(
+                title=dict(text='Privacy Score (0-100)', font=dict(color='#4ECDC4')),
+                tickfont=dict(color='#4ECDC4')
+            ),
+            yaxis2=dict(
+                title=dict(text='Data Types Collected', font=dict(color='#FF6B6B')),
+                tickfont=dict(color='#FF6B6B'),
+                overlaying='y',
+                side='right'
+            ),
+            barmode='group',
+            height=500,
+            hovermode='x unified'
+        )
     )
-    
-    return fig
 
+@lru_cache(maxsize=1)
 def create_privacy_timeline() -> go.Figure:
-    """Create timeline showing privacy evolution"""
+    """Create timeline showing privacy evolution (built once; the figure is shared, so don't modify it)"""
     years = [2010, 2015, 2018, 2020, 2022, 2024]
     data_points = [50, 150, 500, 1200, 2500, 3000]
     
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=years,
-        y=data_points,
-        mode='lines+markers',
-        name='Data Points Collected Daily',
-        line=dict(color='#FF6B6B', width=4),
-        marker=dict(size=10, color='#FF6B6B')
-    ))
-    
     # Add annotations for key events
     annotations = [
         dict(x=2018, y=500, text="GDPR<br>Enacted", showarrow=True, arrowhead=2),
@@ -121,19 +163,34 @@ def create_privacy_timeline() -> go.Figure:
         dict(x=2024, y=3000, text="AI Era<br>Begins", showarrow=True, arrowhead=2)
     ]
     
-    fig.update_layout(
-        title="📈 The Privacy Crisis: Data Collection Over Time",
-        xaxis_title="Year",
-        yaxis_title="Average Data Points Collected Per Person Per Day",
-        annotations=annotations,
-        height=400,
-        showlegend=False
+    return _figure(
+        [dict(
+            type='scatter',
+            x=years,
+            y=data_points,
+            mode='lines+markers',
+            name='Data Points Collected Daily',
+            line=dict(color='#FF6B6B', width=4),
+            marker=dict(size=10, color='#FF6B6B')
+        )],
+        dict(
+            title=dict(text="📈 The Privacy Crisis: Data Collection Over Time"),
+            uirevision='timeline',
+            xaxis=dict(title=dict(text="Year")),
+            yaxis=dict(title=dict(text="Average Data Points Collected Per Person Per Day")),
+            annotations=annotations,
+            height=400,
+            showlegend=False
+        )
     )
-    
-    return fig
 
 def create_data_flow_sankey(platform_data: Dict) -> go.Figure:
-    """Create Sankey diagram showing data flow"""
+    """Create Sankey diagram showing data flow (the same for every platform for now)"""
+    return _data_flow_sankey()
+
+@lru_cache(maxsize=1)
+def _data_flow_sankey() -> go.Figure:
+    """Demo data flow Sankey, built once; the figure is shared, so don't modify it"""
     
     # Simplified data flow for demo
     labels = [
@@ -146,55 +203,108 @@ def create_data_flow_sankey(platform_data: Dict) -> go.Figure:
     target = [1, 2, 2, 3, 4, 5, 6, 7]
     values = [100, 80, 20, 60, 40, 10, 30, 25]
     
-    fig = go.Figure(data=[go.Sankey(
-        node=dict(
-            pad=15,
-            thickness=20,
-            line=dict(color="black", width=0.5),
-            label=labels,
-            color=["#4ECDC4", "#FF6B6B", "#FFA500", "#FF6B6B", "#FF6B6B", 
-                   "#FF6B6B", "#FF6B6B", "#FF6B6B"]
-        ),
-        link=dict(
-            source=source,
-            target=target,
-            value=values,
-            color=["rgba(255, 107, 107, 0.4)"] * len(source)
+    return _figure(
+        [dict(
+            type='sankey',
+            node=dict(
+                pad=15,
+                thickness=20,
+                line=dict(color="black", width=0.5),
+                label=labels,
+                color=["#4ECDC4", "#FF6B6B", "#FFA500", "#FF6B6B", "#FF6B6B", 
+                       "#FF6B6B", "#FF6B6B", "#FF6B6B"]
+            ),
+            link=dict(
+                source=source,
+                target=target,
+                value=values,
+                color="rgba(255, 107, 107, 0.4)"  # applies to every link
+            )
+        )],
+        dict(
+            title=dict(text="🌊 Where Your Data Goes"),
+            uirevision='sankey',
+            height=500,
+            margin=dict(EDGE_MARGIN)
         )
-    )])
-    
-    fig.update_layout(
-        title="🌊 Where Your Data Goes",
-        height=500,
-        margin=dict(t=50, l=0, r=0, b=0)
     )
-    
-    return fig
 
+@lru_cache(maxsize=128)
 def create_risk_gauge(risk_score: int) -> go.Figure:
-    """Create gauge chart for privacy risk"""
+    """Create gauge chart for privacy risk (one shared figure per score, so don't modify it)"""
     
-    fig = go.Figure(go.Indicator(
-        mode = "gauge+number+delta",
-        value = risk_score,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': "Privacy Risk Score"},
-        delta = {'reference': 50},
-        gauge = {
-            'axis': {'range': [None, 100]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, 30], 'color': "#4ECDC4"},
-                {'range': [30, 70], 'color': "#FFA500"},
-                {'range': [70, 100], 'color': "#FF6B6B"}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': 90
-            }
-        }
+    return _figure(
+        [dict(
+            type='indicator',
+            mode="gauge+number+delta",
+            value=risk_score,
+            domain={'x': [0, 1], 'y': [0, 1]},
+            title={'text': "Privacy Risk Score"},
+            delta={'reference': 50},
+            gauge=dict(RISK_GAUGE)
+        )],
+        dict(height=300, uirevision='gauge')
+    )
+
+def figure_to_json(fig: go.Figure) -> bytes:
+    """Encode a figure with orjson instead of plotly's pure-Python JSON encoder"""
+    return orjson.dumps(fig.to_plotly_json(), option=orjson.OPT_SERIALIZE_NUMPY)
+
+# Figures serialized for the browser, so re-renders with the same inputs skip
+# building and encoding the figure again
+
+def data_map_json(data_map: Dict) -> bytes:
+    """create_data_map as JSON, cached by the map's contents"""
+    return _data_map_json(tuple((category, tuple(items)) for category, items in data_map.items()))
+
+@lru_cache(maxsize=64)
+def _data_map_json(data_map_key: tuple) -> bytes:
+    """Build and encode the data map from its hashable form"""
+    return figure_to_json(create_data_map({category: list(items) for category, items in data_map_key}))
+
+def comparison_chart_json(comparison_data: Dict) -> bytes:
+    """create_comparison_chart as JSON, cached by the plotted values"""
+    return _comparison_chart_json(tuple(
+        (platform, data['score'], data['data_count']) for platform, data in comparison_data.items()
     ))
-    
-    fig.update_layout(height=300)
-    return fig
+
+@lru_cache(maxsize=64)
+def _comparison_chart_json(comparison_key: tuple) -> bytes:
+    """Build and encode the comparison chart from its hashable form"""
+    return figure_to_json(create_comparison_chart({
+        platform: {'score': score, 'data_count': data_count}
+        for platform, score, data_count in comparison_key
+    }))
+
+@lru_cache(maxsize=1)
+def privacy_timeline_json() -> bytes:
+    """create_privacy_timeline as JSON, encoded once"""
+    return figure_to_json(create_privacy_timeline())
+
+@lru_cache(maxsize=1)
+def data_flow_sankey_json() -> bytes:
+    """create_data_flow_sankey as JSON, encoded once"""
+    return figure_to_json(_data_flow_sankey())
+
+@lru_cache(maxsize=128)
+def risk_gauge_json(risk_score: int) -> bytes:
+    """create_risk_gauge as JSON; scores are 0-100, so every gauge fits in the cache"""
+    return figure_to_json(create_risk_gauge(risk_score))
+
+@lru_cache(maxsize=128)
+def risk_gauge_png(risk_score: int) -> Optional[str]:
+    """Base64 PNG of the gauge for <img src="data:image/png;base64,...">, or None without kaleido"""
+    if not HAVE_KALEIDO:
+        return None
+    png = create_risk_gauge(risk_score).to_image(format='png', engine='kaleido')
+    return base64.b64encode(png).decode()
+
+def create_all_charts(data_map: Dict, comparison_data: Dict, platform_data: Dict, risk_score: int) -> bytes:
+    """Every dashboard chart as one JSON object, splicing in each chart's cached encoding"""
+    return orjson.dumps({
+        'data_map': orjson.Fragment(data_map_json(data_map)),
+        'comparison': orjson.Fragment(comparison_chart_json(comparison_data)),
+        'timeline': orjson.Fragment(privacy_timeline_json()),
+        'sankey': orjson.Fragment(data_flow_sankey_json()),
+        'gauge': orjson.Fragment(risk_gauge_json(risk_score))
+    })
@@ -0,0 +1,135 @@
+"""
+WSGI entry point for the Privacy Policy Analyzer API
+Serves the browser extension endpoints under gunicorn:
+
+    gunicorn -c gunicorn.conf.py wsgi:flask_app
+"""
+
+import orjson
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask, Response, request
+from flask_cors import CORS
+from policy_analyzer import PolicyAnalyzer
+from scraper import PolicyScraper, normalize_website
+from database import get_db
+from response_cache import cached_call
+
+# Built in the gunicorn master (preload_app); post_fork gives each worker its own
+# client and warm-up, so the master makes no Bedrock call before forking
+analyzer = PolicyAnalyzer(warm=False)
+scraper = PolicyScraper()
+
+# Flask API for browser extension
+flask_app = Flask(__name__)
+CORS(flask_app)
+
+# History/stats writes happen off the request path
+_db_pool = ThreadPoolExecutor(max_workers=2)
+
+def _persist_analysis(analysis: dict, session_id: str, company_name: str):
+    """Save the analysis and session update in one transaction"""
+    get_db().save_with_session(analysis, session_id, company_name)
+
+def _log_persist_error(future: Future):
+    error = future.exception()
+    if error:
+        print(f"Database save error: {error}")
+
+def ojson(obj, status: int = 200) -> Response:
+    """JSON response encoded with orjson (much faster than jsonify on big analyses)"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+def _analyze_company(company_website: str) -> dict:
+    """Scrape and analyze a company's privacy policy"""
+    # Use scraper to analyze company website
+    scrape_result = scraper.scrape_company_website(company_website)
+
+    if scrape_result['scraped']:
+        # Successfully scraped - analyze with AI
+        analysis = analyzer.analyze_scraped_policy(
+            scrape_result['text'],
+            scrape_result['company_name']
+        )
+        analysis['source'] = 'live_scraping'
+        analysis['privacy_url'] = scrape_result['privacy_url']
+    else:
+        # Scraping failed - use generic analysis (marked degraded, so not cached; the site may come back)
+        analysis = analyzer.get_generic_analysis(scrape_result['company_name'])
+        analysis['source'] = 'generic'
+
+    analysis['website'] = company_website
+    return analysis
+
+@flask_app.route('/api/analyze', methods=['POST'])
+def api_analyze():
+    try:
+        data = request.json
+        analysis_type = data.get('analysis_type', 'policy')
+
+        if analysis_type == 'company':
+            # Company website analysis
+            company_website = data.get('company_website') or data.get('url', '')
+
+            if not company_website:
+                return ojson({'error': 'No company website provided'}, 400)
+
+            # Clean up URL
+            company_website = normalize_website(company_website)
+
+            analysis = cached_call({'url': company_website, 'analysis_type': 'company'},
+                                   lambda: _analyze_company(company_website))
+
+            # Save to database in the background; the client doesn't wait for it
+            _db_pool.submit(
+                _persist_analysis, analysis, 'browser_extension', analysis['company_name']
+            ).add_done_callback(_log_persist_error)
+
+            return ojson(analysis)
+
+        else:
+            # Regular policy text analysis
+            platform = data.get('platform', 'Unknown Platform')
+            policy_text = data.get('text', '')
+
+            if policy_text:
+                # Analyze provided text
+                analysis = cached_call({'platform': platform, 'analysis_type': 'policy', 'text': policy_text},
+                                       lambda: analyzer.analyze_text_for_harmful_points(policy_text, platform))
+            else:
+                # Use predefined platform analysis. Not response-cached: the score follows
+                # edits to data/policies, and the Bedrock call is cached per prompt anyway
+                analysis = analyzer.get_harmful_points(platform)
+
+            return ojson(analysis)
+
+    except Exception as e:
+        print(f"API Error: {e}")
+        return ojson({'error': str(e)}, 500)
+
+@flask_app.route('/api/health', methods=['GET'])
+def api_health():
+    return ojson({'status': 'ok', 'message': 'Privacy Policy Analyzer API is running'})
+
+@flask_app.route('/api/chat', methods=['POST'])
+def api_chat():
+    try:
+        data = request.json
+        question = data.get('question', '')
+        platform = data.get('platform', 'Unknown Platform')
+
+        if not question.strip():
+            return ojson({'error': 'Question is required'}, 400)
+
+        # Use the analyzer's chat functionality
+        response = cached_call(
+            {'question': question, 'platform': platform, 'analysis_type': 'chat'},
+            lambda: analyzer.chat_with_ai(question, platform)
+        )
+
+        return ojson({
+            'response': response,
+            'platform': platform,
+            'question': question
+        })
+    except Exception as e:
+        return ojson({'error': str(e)}, 500)